@@ -1,13 +1,60 @@
 # File: app/api/deps.py
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from typing import Generator, Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
+from app.core.coalesce import SingleFlight, UpdateBatcher
+from app.core.compute import ComputePool, JobManager
 from app.core.config import get_settings
+from app.models.sessions import Session, SessionStore
+from app.models.spectrum_table import SpectrumTable
+from app.models.string_theory import use_spectrum_table
+from app.models.state_backend import MemoryStateBackend, RedisStateBackend
 from datetime import datetime
 
 settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login")
+session_store = SessionStore(
+    max_sessions=settings.MAX_SESSIONS,
+    idle_timeout=settings.SESSION_IDLE_SECONDS,
+    history_size=settings.HISTORY_SIZE
+)
+
+if settings.STATE_BACKEND == "redis":
+    # The local store becomes a read-through cache in front of Redis
+    state_backend = RedisStateBackend.from_url(
+        settings.REDIS_URL,
+        session_store,
+        pool_size=settings.REDIS_POOL_SIZE,
+        prefix=settings.REDIS_KEY_PREFIX,
+        ttl=settings.SESSION_IDLE_SECONDS
+    )
+else:
+    state_backend = MemoryStateBackend(session_store)
+
+if settings.SPECTRUM_TABLE_PATH:
+    # Only the header is read: the file is memory-mapped, its pages shared by all workers
+    use_spectrum_table(SpectrumTable(settings.SPECTRUM_TABLE_PATH,
+                                     interpolate=settings.SPECTRUM_TABLE_INTERPOLATE))
+
+# Blocking NumPy work for heavy requests and background jobs
+compute_pool = ComputePool(settings.COMPUTE_EXECUTOR, settings.COMPUTE_WORKERS)
+job_manager = JobManager(
+    compute_pool,
+    max_queue=settings.MAX_JOB_QUEUE,
+    max_finished=settings.MAX_FINISHED_JOBS
+)
+
+# Identical concurrent reads share one encoding; bursts of writes become one update
+state_flights = SingleFlight("read")
+update_batcher = UpdateBatcher(window=settings.UPDATE_BATCH_WINDOW)
 
 async def get_current_time() -> datetime:
-    return datetime.utcnow()
\ No newline at end of file
+    return datetime.utcnow()
+
+async def get_session(x_session_id: Optional[str] = Header(None)) -> Session:
+    """Session selected by the X-Session-ID header; the shared default otherwise"""
+    try:
+        return await state_backend.get_session(x_session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
\ No newline at end of file
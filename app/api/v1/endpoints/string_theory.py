@@ -1,52 +1,786 @@
 # File: app/api/v1/endpoints/string_theory.py
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict
-from app.schemas.string_theory import StringParameters, SystemState, SystemResponse
-from app.models.string_theory import StringTheorySystem
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Iterator, List, Literal, Optional, Union
+from app.schemas.string_theory import (
+    StringParameters, SystemState, SystemResponse,
+    ParameterRange, SweepRequest, SweepResponse, TowerResponse,
+    JobRequest, JobResponse, HistoryResponse,
+    ThermodynamicsRequest, ThermodynamicsResponse
+)
+from app.models.string_theory import (
+    N_STATES, StringTheorySystem, cache_stats, spectrum_table_stats
+)
+from app.models.degeneracy import TheoryType
+from app.models.downsample import DownsampleMethod
+from app.models.history import StateHistory
+from app.models.sessions import Session
+from app.models.state_backend import StateConflictError
+from app.api.deps import (
+    compute_pool, get_session, job_manager, state_backend, state_flights, update_batcher
+)
+from app.core.compute import JobQueueFullError
+from app.core.config import get_settings
+from app.core.metrics import timed
+from app.core.serialization import (
+    BinaryResponse, FastJSONResponse, MsgpackResponse, dumps, negotiate
+)
 from datetime import datetime
+from functools import partial
+import numpy as np
 import logging
+import zlib
 
 router = APIRouter()
-system = StringTheorySystem()
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
-@router.get("/", response_model=SystemResponse)
-async def get_system_state():
+def _etag(epoch: str, version: int, *variant) -> str:
+    """Weak ETag for a state version; query options that shape the body are the variant"""
+    # The session epoch keeps a stale ETag from matching after a restart
+    tag = f"{epoch}-{version}"
+    if any(option is not None for option in variant):
+        tag += f"-{zlib.crc32(repr(variant).encode()):08x}"
+    return f'W/"{tag}"'
+
+def _etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag.removeprefix('W/') in (
+        tag.removeprefix('W/') for tag in candidates)
+
+def _range_size(axis: ParameterRange, integer: bool = False) -> float:
+    """Number of values a range expands to, computed without expanding it"""
+    if axis.num is not None:
+        return axis.num
+    if axis.step is not None or integer:
+        # Same count as the np.arange call in _resolve_axis; inf for absurd spans
+        return max(float(np.ceil((axis.stop - axis.start) / (axis.step or 1) + 0.5)), 0.0)
+    raise ValueError("Range requires either 'num' or 'step'")
+
+def _resolve_axis(axis: Optional[Union[List, ParameterRange]], limit: int,
+                  integer: bool = False) -> Optional[np.ndarray]:
+    """Expand a sweep axis (explicit list or range) into an array of values.
+
+    Ranges longer than limit are rejected before anything is allocated.
+    """
+    if axis is None or isinstance(axis, list):
+        return axis
+    size = _range_size(axis, integer)
+    if size > limit:
+        raise ValueError(f"Range has {size:.0f} points, limit is {limit}")
+    if axis.num is not None:
+        values = np.linspace(axis.start, axis.stop, axis.num)
+    else:
+        step = axis.step or 1
+        values = np.arange(axis.start, axis.stop + step / 2, step)
+    return np.unique(np.rint(values).astype(int)) if integer else values
+
+class StateQuery:
+    """Query options shaping a state response"""
+
+    def __init__(
+        self,
+        max_level: Optional[int] = Query(
+            None, ge=0, le=settings.MAX_DOWNSAMPLED_SPECTRUM_LEVEL,
+            description="Highest mass level to include in the spectrum; above "
+                        f"{settings.MAX_INLINE_SPECTRUM_LEVEL} only with max_points"),
+        fields: Optional[str] = Query(
+            None, description="Comma-separated fields to return, e.g. "
+                              "'dimensions,compactification.topology'"),
+        exclude: Optional[str] = Query(
+            None, description="Comma-separated fields to leave out, e.g. "
+                              "'compactification.metric,mass_spectrum'"),
+        theory: TheoryType = Query(
+            "superstring", description="String theory whose level degeneracies are counted"),
+        log_degeneracy: bool = Query(
+            False, description="Return natural-log degeneracies, asymptotic at large levels"),
+        max_points: Optional[int] = Query(
+            None, ge=4, description="Downsample the spectrum to at most this many levels, "
+                                    "listed in 'levels'"),
+        downsample: DownsampleMethod = Query(
+            "lttb", description="Downsampling method: 'lttb' keeps the visual shape, "
+                                "'minmax' every bucket's extremes")
+    ):
+        if (max_level or 0) > settings.MAX_INLINE_SPECTRUM_LEVEL and max_points is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Spectra above level {settings.MAX_INLINE_SPECTRUM_LEVEL} "
+                       "must be downsampled with max_points"
+            )
+        self.max_level = max_level
+        self.fields = fields
+        self.exclude = exclude
+        self.theory = theory
+        self.log_degeneracy = log_degeneracy
+        self.max_points = max_points
+        self.downsample = downsample
+
+    @property
+    def variant(self) -> tuple:
+        """Options that change the representation, for the ETag"""
+        theory = None if self.theory == "superstring" else self.theory
+        downsample = None if self.max_points is None else self.downsample
+        return (self.max_level, self.fields, self.exclude, theory,
+                self.log_degeneracy or None, self.max_points, downsample)
+
+    @property
+    def is_default(self) -> bool:
+        return all(option is None for option in self.variant)
+
+DEFAULT_QUERY = StateQuery(None, None, None, "superstring", False, None, "lttb")
+
+def _field_tree(spec: Optional[str]) -> Optional[Dict]:
+    """Parse 'a,b.c' into {'a': None, 'b': {'c': None}}; None marks a whole subtree"""
+    if not spec:
+        return None
+    tree: Dict = {}
+    for path in spec.split(','):
+        node = tree
+        *parents, leaf = path.strip().split('.')
+        for part in parents:
+            node = node.setdefault(part, {})
+            if node is None:
+                break
+        else:
+            node[leaf] = None
+    return tree
+
+def _include(state: Dict, tree: Dict) -> Dict:
+    selected = {}
+    for key, sub in tree.items():
+        if key in state:
+            value = state[key]
+            selected[key] = _include(value, sub) if sub and isinstance(value, dict) else value
+    return selected
+
+def _exclude(state: Dict, tree: Dict) -> Dict:
+    selected = {}
+    for key, value in state.items():
+        if key not in tree:
+            selected[key] = value
+        elif tree[key] is not None and isinstance(value, dict):
+            selected[key] = _exclude(value, tree[key])
+    return selected
+
+@timed("serialize_state")
+def _system_state(system: StringTheorySystem, query: StateQuery = DEFAULT_QUERY) -> Dict:
+    """Serialized system state with its spectrum, as returned by the API"""
+    include_tree, exclude_tree = _field_tree(query.fields), _field_tree(query.exclude)
+    state = system.to_dict()
+    state.update({
+        'mass_spectrum': None,
+        'degeneracy': None,
+        'timestamp': datetime.utcnow().isoformat(),
+        'version': system.version
+    })
+    if include_tree is not None:
+        state = _include(state, include_tree)
+    if exclude_tree is not None:
+        state = _exclude(state, exclude_tree)
+    # Only computed when they are actually returned
+    points = None
+    if query.max_points is not None and ('mass_spectrum' in state or 'degeneracy' in state):
+        points = system.mass_spectrum_points(query.max_level, query.max_points,
+                                             query.downsample)
+        state['levels'] = points['levels']
+    if 'mass_spectrum' in state:
+        state['mass_spectrum'] = (points['mass_spectrum'] if points is not None
+                                  else system.mass_spectrum_array(query.max_level))
+    if 'degeneracy' in state:
+        degeneracy = system.calculate_degeneracy(
+            query.max_level, query.theory, query.log_degeneracy)
+        if points is not None:  # Exact counts stop at MAX_EXACT_LEVEL: null beyond it
+            degeneracy = [degeneracy[level] if level < len(degeneracy) else None
+                          for level in points['levels'].tolist()]
+        state['degeneracy'] = degeneracy
+    return state
+
+def _sse_event(state: Dict) -> bytes:
+    return b"id: %d\nevent: state\ndata: %s\n\n" % (state['version'], dumps(state))
+
+def _publish_state(session: Session, system: StringTheorySystem,
+                   state: Optional[Dict] = None) -> None:
+    """Push a new state to the session's event subscribers"""
+    if session.has_subscribers:
+        # Only encode when someone is listening; shared by every subscriber
+        session.broadcaster.publish(_sse_event(state or _system_state(system)))
+
+# Updates applied by other workers reach this worker's subscribers too
+state_backend.on_remote_update = _publish_state
+
+async def _compute(heavy: bool, func, *args):
+    """Run func on the compute pool when heavy; light work stays inline, with no thread hop"""
+    if heavy:
+        return await compute_pool.run(func, *args)
+    return func(*args)
+
+def _is_heavy(query: StateQuery, system: Optional[StringTheorySystem] = None) -> bool:
+    """Whether a response is worth a hop to the compute pool; with system, counting degeneracies"""
+    if (query.max_level or 0) > settings.OFFLOAD_SPECTRUM_LEVEL:
+        return True
+    return system is not None and system.degeneracy_work(
+        query.max_level, query.theory, query.log_degeneracy) > settings.OFFLOAD_DEGENERACY_LEVELS
+
+def _format_variant(fmt: str) -> Optional[str]:
+    """Response format as an ETag variant; JSON is the default representation"""
+    return None if fmt == "json" else fmt
+
+async def _state_response(system: StringTheorySystem, query: StateQuery, fmt: str,
+                          headers: Dict[str, str], state: Optional[Dict] = None) -> Response:
+    """Encode the state in the negotiated format, bypassing response-model validation.
+
+    ``binary`` sends only the mass spectrum, as raw little-endian float64.
+    Downsampled, it sends the selected levels and then their masses, with
+    the shape in ``X-Shape``.
+    """
+    headers['Vary'] = 'Accept'
+    if fmt == "binary" and query.max_points is not None:
+        points = await _compute(_is_heavy(query), system.mass_spectrum_points,
+                                query.max_level, query.max_points, query.downsample)
+        levels = points['levels']
+        headers.update({'X-Version': str(system.version), 'X-Shape': f"2,{levels.size}"})
+        return BinaryResponse(np.stack([levels, points['mass_spectrum']]), headers=headers)
+    if fmt == "binary":
+        spectrum = await _compute(_is_heavy(query), system.mass_spectrum_array, query.max_level)
+        headers.update({'X-Version': str(system.version), 'X-Levels': str(spectrum.size)})
+        return BinaryResponse(spectrum, headers=headers)
+    if state is None:
+        state = await _compute(_is_heavy(query, system), _system_state, system, query)
+    content = {
+        "status": "success",
+        "data": state
+    }
+    if fmt == "msgpack":
+        return MsgpackResponse(content, headers=headers)
+    return FastJSONResponse(content, headers=headers)
+
+def _copy_response(response: Response) -> Response:
+    """Own response around a shared rendered body; middleware may add headers in place"""
+    return Response(response.body, status_code=response.status_code,
+                    headers=dict(response.headers))
+
+async def _shared_state_response(session: Session, system: StringTheorySystem,
+                                 query: StateQuery, fmt: str) -> Response:
+    """State response in which identical concurrent requests share one encoding"""
+    # The ETag covers the session epoch, version, query variant and format
+    etag = _etag(session.epoch, system.version, *query.variant, _format_variant(fmt))
+    shared = await state_flights.do(
+        (session.session_id, etag),
+        partial(_state_response, system, query, fmt, {'ETag': etag}))
+    return _copy_response(shared)
+
+@router.get("/", response_model=SystemResponse, response_model_exclude_unset=True)
+async def get_system_state(query: StateQuery = Depends(),
+                           if_none_match: Optional[str] = Header(None),
+                           accept: Optional[str] = Header(None),
+                           session: Session = Depends(get_session)):
     """
     Get current state of the string theory system.
+
+    Answers 304 Not Modified when If-None-Match carries the current ETag.
+    ``Accept: application/octet-stream`` returns the raw float64 mass
+    spectrum and ``application/msgpack`` the state as MessagePack.
+    """
+    try:
+        system = session.system
+        fmt = negotiate(accept)
+        etag = _etag(session.epoch, system.version, *query.variant, _format_variant(fmt))
+        if _etag_matches(etag, if_none_match):
+            return Response(status_code=304, headers={'ETag': etag, 'Vary': 'Accept'})
+        return await _shared_state_response(session, system, query, fmt)
+    except Exception as e:
+        logger.error(f"Error getting system state: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+async def _write(session: Session, writes: List[Dict]) -> StringTheorySystem:
+    """Apply a batch of writes in order as one new version, and announce the new state"""
+    # The updated system is never mutated again, so it can be read without the lock
+    previous = session.system
+    system = await state_backend.update(session, writes)
+    if system is not previous:  # No-op updates have nothing to announce
+        _publish_state(session, system)
+    return system
+
+async def _apply_update(session: Session, params: Dict, query: StateQuery,
+                        accept: Optional[str]) -> Response:
+    """Queue params behind the session's pending writes and respond with the result"""
+    system = await update_batcher.submit(session, params, partial(_write, session))
+    return await _shared_state_response(session, system, query, negotiate(accept))
+
+@router.post("/update", response_model=SystemResponse, response_model_exclude_unset=True)
+async def update_parameters(params: StringParameters,
+                            query: StateQuery = Depends(),
+                            accept: Optional[str] = Header(None),
+                            session: Session = Depends(get_session)):
+    """
+    Update string theory system parameters.
+
+    Updates are atomic per session: a rejected update leaves the state as it was.
+    The response format is negotiated as for ``GET /``.
+    """
+    try:
+        return await _apply_update(session, params.model_dump(exclude_unset=True),
+                                   query, accept)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except StateConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error updating parameters: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+@router.get("/events")
+async def stream_state_events(request: Request, session: Session = Depends(get_session)):
+    """
+    Push the system state to the client as Server-Sent Events.
+
+    The current state is sent on connect and again after every successful
+    update. A slow client skips intermediate versions and only receives the
+    latest one.
+    """
+    broadcaster = session.broadcaster
+    subscription = broadcaster.subscribe()
+
+    async def events():
+        try:
+            yield _sse_event(_system_state(session.system))
+            while not await request.is_disconnected():
+                message = await subscription.get(timeout=settings.SSE_KEEPALIVE_SECONDS)
+                # Comment lines keep idle connections open through proxies
+                yield message if message is not None else b": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={'Cache-Control': 'no-cache'})
+
+def _sweep_axes(request: SweepRequest) -> Dict:
+    """Resolve the sweep axes and enforce the grid size limit"""
+    axes = {
+        'dimensions': _resolve_axis(request.dimensions, settings.MAX_SWEEP_POINTS, integer=True),
+        'tension': _resolve_axis(request.tension, settings.MAX_SWEEP_POINTS),
+        'alpha_prime': _resolve_axis(request.alpha_prime, settings.MAX_SWEEP_POINTS),
+        'topology': request.topology,
+    }
+    n_points = int(np.prod([len(a) for a in axes.values() if a is not None]))
+    if n_points > settings.MAX_SWEEP_POINTS:
+        raise ValueError(
+            f"Sweep grid has {n_points} points, limit is {settings.MAX_SWEEP_POINTS}"
+        )
+    return axes
+
+def _columns_response(result: Dict[str, np.ndarray], fmt: str) -> Response:
+    """Columnar result with one spectrum row per point, in the negotiated format"""
+    spectrum = result['mass_spectrum']
+    headers = {'Vary': 'Accept'}
+    if fmt == "binary":
+        headers['X-Shape'] = f"{spectrum.shape[0]},{spectrum.shape[1]}"
+        return BinaryResponse(spectrum, headers=headers)
+    content = {
+        "status": "success",
+        "data": {
+            'n_points': spectrum.shape[0],
+            'n_states': spectrum.shape[1],
+            **result
+        }
+    }
+    if fmt == "msgpack":
+        return MsgpackResponse(content, headers=headers)
+    return FastJSONResponse(content, headers=headers)
+
+@router.post("/sweep", response_model=SweepResponse)
+async def sweep_mass_spectrum(request: SweepRequest,
+                              accept: Optional[str] = Header(None),
+                              session: Session = Depends(get_session)):
+    """
+    Calculate mass spectra over a grid of parameters without changing the system.
+
+    ``Accept: application/octet-stream`` returns only the (n_points x n_states)
+    spectrum as raw little-endian float64, row-major, with its shape in the
+    ``X-Shape`` header; ``application/msgpack`` returns float columns as raw
+    float64 bin fields.
     """
     try:
-        state = system.to_dict()
-        state.update({
-            'mass_spectrum': system.calculate_mass_spectrum(),
-            'timestamp': datetime.utcnow().isoformat()
-        })
+        axes = _sweep_axes(request)
+        n_values = N_STATES * int(np.prod([len(a) for a in axes.values() if a is not None]))
+        result = await _compute(n_values > settings.OFFLOAD_SWEEP_VALUES,
+                                partial(session.system.sweep_mass_spectrum, **axes))
+        return _columns_response(result, negotiate(accept))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error calculating sweep: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+def _thermodynamics(system: StringTheorySystem, request: ThermodynamicsRequest,
+                    temperatures: np.ndarray) -> Dict:
+    hagedorn = system.hagedorn_temperature(request.theory)
+    if request.relative:
+        temperatures = temperatures * hagedorn
+    result = {
+        'hagedorn_temperature': hagedorn,
+        **system.calculate_thermodynamics(temperatures, request.theory, request.max_level)
+    }
+    if request.density:
+        result['density_of_states'] = system.calculate_density_of_states(
+            request.max_level, request.theory)
+    return result
+
+@router.post("/thermodynamics", response_model=ThermodynamicsResponse)
+async def get_thermodynamics(request: ThermodynamicsRequest,
+                             accept: Optional[str] = Header(None),
+                             session: Session = Depends(get_session)):
+    """
+    Single-string partition function, free energy, energy and entropy over
+    a grid of temperatures, in the mass units of the spectrum.
+
+    With ``relative`` the temperatures are fractions of the Hagedorn
+    temperature. Above it the partition function diverges and the values
+    are null; at it, so are the energy and entropy in D <= 5.
+    """
+    try:
+        temperatures = np.asarray(_resolve_axis(request.temperature,
+                                                settings.MAX_TEMPERATURE_POINTS), dtype=float)
+        if temperatures.size > settings.MAX_TEMPERATURE_POINTS:
+            raise ValueError(f"Temperature grid has {temperatures.size} points, "
+                             f"limit is {settings.MAX_TEMPERATURE_POINTS}")
+        heavy = temperatures.size * request.max_level > settings.OFFLOAD_SWEEP_VALUES
+        result = await _compute(heavy, _thermodynamics, session.system, request, temperatures)
+        content = {
+            "status": "success",
+            "data": result
+        }
+        if negotiate(accept) == "msgpack":
+            return MsgpackResponse(content, headers={'Vary': 'Accept'})
+        return FastJSONResponse(content, headers={'Vary': 'Accept'})
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error calculating thermodynamics: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+async def _session_history(session: Session) -> StateHistory:
+    history = await state_backend.history(session)
+    if history is None:
+        raise HTTPException(
+            status_code=404,
+            detail="History is disabled"
+        )
+    return history
+
+async def _history_parameters(session: Session, version: int) -> Dict:
+    params = (await _session_history(session)).parameters(version)
+    if params is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Version {version} is not in the history"
+        )
+    return params
+
+@router.get("/history", response_model=HistoryResponse)
+async def get_history(start: Optional[float] = Query(None, description="Epoch seconds"),
+                      end: Optional[float] = Query(None, description="Epoch seconds"),
+                      max_points: Optional[int] = Query(None, ge=1),
+                      accept: Optional[str] = Header(None),
+                      session: Session = Depends(get_session)):
+    """
+    Versions of the session recorded between start and end, oldest first.
+
+    Only the most recent ``HISTORY_SIZE`` versions are kept. With
+    ``max_points``, evenly spaced versions are returned, always including
+    the first and last in range. Formats are negotiated as for ``/sweep``.
+    """
+    history = await _session_history(session)
+    try:
+        return _columns_response(history.query(start, end, max_points), negotiate(accept))
+    except Exception as e:
+        logger.error(f"Error reading history: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+@router.get("/history/{version}", response_model=SystemResponse,
+            response_model_exclude_unset=True)
+async def get_history_snapshot(version: int,
+                               query: StateQuery = Depends(),
+                               accept: Optional[str] = Header(None),
+                               session: Session = Depends(get_session)):
+    """Full state of a recorded version, as ``GET /`` returned it at the time"""
+    params = await _history_parameters(session, version)
+    try:
+        system = StringTheorySystem.from_parameters(params)
+        return await _state_response(system, query, negotiate(accept), {})
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error reading snapshot: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+@router.post("/history/{version}/restore", response_model=SystemResponse,
+             response_model_exclude_unset=True)
+async def restore_history_snapshot(version: int,
+                                   query: StateQuery = Depends(),
+                                   accept: Optional[str] = Header(None),
+                                   session: Session = Depends(get_session)):
+    """
+    Make a recorded version current again.
+
+    The restore is applied as an ordinary update, so it gets a new version
+    number and is itself recorded in the history.
+    """
+    params = await _history_parameters(session, version)
+    del params['version']
+    try:
+        return await _apply_update(session, params, query, accept)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except StateConflictError as e:
+        raise HTTPException(
+            status_code=409,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error restoring version {version}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
+        )
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: JobRequest, session: Session = Depends(get_session)):
+    """
+    Queue a spectrum or sweep computation on the compute pool.
+
+    The job works on the state at submission time; later updates do not
+    affect it. Poll ``GET /jobs/{job_id}`` and fetch ``/jobs/{job_id}/result``.
+    """
+    try:
+        # Updates swap in a new system, so this one is a stable snapshot
+        system = session.system
+        if request.kind == "spectrum":
+            max_level = request.max_level if request.max_level is not None else N_STATES - 1
+            if max_level > settings.MAX_JOB_SPECTRUM_LEVEL:
+                raise ValueError(
+                    f"Job spectra are limited to level {settings.MAX_JOB_SPECTRUM_LEVEL}"
+                )
+            job = job_manager.submit("spectrum", {'max_level': max_level},
+                                     system.mass_spectrum_array, max_level)
+        else:
+            sweep = request.sweep or SweepRequest()
+            axes = _sweep_axes(sweep)
+            job = job_manager.submit("sweep", sweep.model_dump(exclude_none=True),
+                                     partial(system.sweep_mass_spectrum, **axes))
         return {
             "status": "success",
-            "data": state
+            "data": job.to_dict()
         }
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e)
+        )
     except Exception as e:
-        logger.error(f"Error getting system state: {str(e)}")
+        logger.error(f"Error submitting job: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Internal server error"
         )
 
-@router.post("/update", response_model=SystemResponse)
-async def update_parameters(params: StringParameters):
+@router.get("/jobs/stats")
+async def get_job_stats():
     """
-    Update string theory system parameters.
+    Get the number of active jobs and retained jobs by status.
+    """
+    return {
+        "status": "success",
+        "data": job_manager.stats()
+    }
+
+def _get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found"
+        )
+    return job
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str,
+                  wait: float = Query(0, ge=0, le=30,
+                                      description="Seconds to wait for the job to finish")):
+    """
+    Get a job's status and timings, optionally waiting for it to finish.
+    """
+    job = await job_manager.wait(_get_job(job_id), wait)
+    return {
+        "status": "success",
+        "data": job.to_dict()
+    }
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, accept: Optional[str] = Header(None)):
+    """
+    Fetch a finished job's result, in the format negotiated from Accept.
+    """
+    job = _get_job(job_id)
+    if job.status == "failed":
+        raise HTTPException(
+            status_code=400 if job.error_type == "ValueError" else 500,
+            detail=job.error
+        )
+    if job.status != "completed":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is {job.status}"
+        )
+    fmt = negotiate(accept)
+    if job.kind == "sweep":
+        return _columns_response(job.result, fmt)
+    if fmt == "binary":
+        return BinaryResponse(job.result, headers={'X-Levels': str(job.result.size),
+                                                   'Vary': 'Accept'})
+    content = {
+        "status": "success",
+        "data": {'max_level': job.result.size - 1, 'mass_spectrum': job.result}
+    }
+    if fmt == "msgpack":
+        return MsgpackResponse(content, headers={'Vary': 'Accept'})
+    return FastJSONResponse(content, headers={'Vary': 'Accept'})
+
+@router.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job.
+    """
+    job = _get_job(job_id)
+    if not job_manager.cancel(job):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is already {job.status}"
+        )
+    return {
+        "status": "success",
+        "data": job.to_dict()
+    }
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get size and hit/miss counters of the spectrum and state cache, and of
+    the precomputed spectrum table when one is configured.
+    """
+    return {
+        "status": "success",
+        "data": {**cache_stats(), 'table': spectrum_table_stats()}
+    }
+
+@router.post("/sessions")
+async def create_session():
+    """
+    Create an independent simulation session; send its id as X-Session-ID.
+    """
+    session = await state_backend.create_session()
+    return {
+        "status": "success",
+        "data": {"session_id": session.session_id}
+    }
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """
+    Discard a session and its state.
+    """
+    if not await state_backend.delete_session(session_id):
+        raise HTTPException(
+            status_code=404,
+            detail="Session not found"
+        )
+    return {"status": "success"}
+
+@router.get("/sessions/stats")
+async def get_session_stats():
+    """
+    Get session count, evictions and approximate memory usage.
+    """
+    return {
+        "status": "success",
+        "data": state_backend.memory_report()
+    }
+
+def _ndjson_blocks(blocks: Iterator[np.ndarray], block_size: int) -> Iterator[bytes]:
+    for i, masses in enumerate(blocks):
+        yield dumps({'offset': i * block_size, 'mass_spectrum': masses}) + b"\n"
+
+def _binary_blocks(blocks: Iterator[np.ndarray]) -> Iterator[bytes]:
+    for masses in blocks:
+        yield masses.astype('<f8', copy=False).tobytes()
+
+@router.get("/spectrum/tower", response_model=TowerResponse)
+async def get_tower_spectrum(
+    cutoff: float = Query(..., gt=0, description="Highest mass to enumerate"),
+    limit: Optional[int] = Query(None, ge=1, description="Keep only the lowest levels"),
+    session: Session = Depends(get_session)
+):
+    """
+    Enumerate Kaluza-Klein momentum and winding modes on the compactification radii.
+
+    Each distinct mass up to the cutoff is returned with the number of
+    (momentum, winding, oscillator) configurations that produce it. The
+    work grows steeply with the cutoff, so it always runs on the compute pool.
     """
     try:
-        system.update_parameters(params.model_dump(exclude_unset=True))  # <-- This line goes here
-        state = system.to_dict()
-        state.update({
-            'mass_spectrum': system.calculate_mass_spectrum(),
-            'timestamp': datetime.utcnow().isoformat()
-        })
+        tower = await compute_pool.run(session.system.calculate_tower_spectrum, cutoff, limit)
         return {
             "status": "success",
-            "data": state
+            "data": {
+                'cutoff': cutoff,
+                'n_levels': len(tower['mass']),
+                'mass': tower['mass'].tolist(),
+                'multiplicity': tower['multiplicity'].tolist(),
+            }
         }
     except ValueError as e:
         raise HTTPException(
@@ -54,8 +788,34 @@ async def update_parameters(params: StringParameters):
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Error updating parameters: {str(e)}")
+        logger.error(f"Error enumerating tower spectrum: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail="Internal server error"
-        )
\ No newline at end of file
+        )
+
+@router.get("/spectrum/stream")
+async def stream_mass_spectrum(
+    max_level: int = Query(..., ge=0, le=settings.MAX_STREAM_SPECTRUM_LEVEL),
+    format: Literal["ndjson", "binary"] = "ndjson",
+    session: Session = Depends(get_session)
+):
+    """
+    Stream the mass spectrum for levels 0..max_level in fixed-size blocks.
+
+    ``ndjson`` yields one ``{"offset", "mass_spectrum"}`` object per block;
+    ``binary`` yields raw little-endian float64 values.
+    """
+    block_size = settings.SPECTRUM_BLOCK_SIZE
+    blocks = session.system.iter_mass_spectrum(max_level, block_size)
+    headers = {
+        'X-Max-Level': str(max_level),
+        'X-Block-Size': str(block_size),
+    }
+    if format == "binary":
+        return StreamingResponse(_binary_blocks(blocks),
+                                 media_type="application/octet-stream",
+                                 headers=headers)
+    return StreamingResponse(_ndjson_blocks(blocks, block_size),
+                             media_type="application/x-ndjson",
+                             headers=headers)
\ No newline at end of file
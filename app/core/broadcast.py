@@ -0,0 +1,54 @@
+# File: app/core/broadcast.py
+import asyncio
+from typing import Any, Optional, Set
+
+
+class Subscription:
+    """Latest-value mailbox for one subscriber.
+
+    Publishing never blocks: a slow consumer only ever sees the newest
+    message, intermediate ones are overwritten.
+    """
+
+    def __init__(self):
+        self._latest: Any = None
+        self._event = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, message: Any) -> None:
+        if self._event.is_set():
+            self.dropped += 1
+        self._latest = message
+        self._event.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Wait for the next message; returns None if timeout expires first"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._event.clear()
+        message, self._latest = self._latest, None
+        return message
+
+
+class Broadcaster:
+    """Fan-out of messages to all current subscribers"""
+
+    def __init__(self):
+        self._subscribers: Set[Subscription] = set()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription()
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, message: Any) -> None:
+        for subscription in self._subscribers:
+            subscription.offer(message)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
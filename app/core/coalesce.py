@@ -0,0 +1,119 @@
+# File: app/core/coalesce.py
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+import asyncio
+
+from app.core.metrics import REGISTRY
+
+COALESCED = REGISTRY.counter(
+    "cats_cradle_coalesced_requests_total",
+    "Requests answered by another request's computation or write batch", ("kind",))
+BATCH_SIZE = REGISTRY.histogram(
+    "cats_cradle_update_batch_size", "Parameter writes merged into one update",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+
+
+def _consume(future: asyncio.Future) -> None:
+    """Mark a failure as seen, in case every waiter went away before it arrived"""
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution.
+
+    The first caller starts the work; callers arriving while it runs await
+    the same result or exception. A waiter that is cancelled does not cancel
+    the shared work. Nothing is kept once the call completes, so this is
+    not a cache: later callers start afresh.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            COALESCED.inc(self.name)
+        else:
+            future = self._calls[key] = asyncio.ensure_future(func())
+            future.add_done_callback(_consume)
+            future.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+
+
+# apply(writes) -> result, e.g. a state backend update for one session that
+# applies the writes in order as a single new version
+Apply = Callable[[List[Dict]], Awaitable[Any]]
+
+
+class UpdateBatcher:
+    """Merges bursts of writes to the same key into one application.
+
+    Writes are applied in arrival order. Those that arrive while a batch is
+    being applied (or within `window` seconds of the first one) are handed
+    to `apply` together, in order, so the result is the state applying them
+    one by one would give; every caller in the batch gets the same result.
+    If the batch is rejected, it is replayed one write at a time so that
+    each caller gets its own outcome and one bad write does not sink the
+    others.
+    """
+
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self._pending: Dict[Hashable, List[Tuple[Dict, asyncio.Future]]] = {}
+        self._draining: set = set()
+
+    async def submit(self, key: Hashable, params: Dict, apply: Apply) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(key, []).append((params, future))
+        if key not in self._draining:
+            self._draining.add(key)
+            asyncio.ensure_future(self._drain(key, apply))
+        return await future
+
+    async def _drain(self, key: Hashable, apply: Apply) -> None:
+        batch: List[Tuple[Dict, asyncio.Future]] = []
+        try:
+            # Let writes sent alongside the first one join its batch
+            await asyncio.sleep(self.window)
+            while self._pending.get(key):
+                batch = self._pending.pop(key)
+                await self._apply(batch, apply)
+        finally:
+            self._draining.discard(key)
+            for _, future in batch:  # Only unresolved if the drain itself was cancelled
+                if not future.done():
+                    future.cancel()
+
+    async def _apply(self, batch: List[Tuple[Dict, asyncio.Future]], apply: Apply) -> None:
+        try:
+            outcomes = [(await apply([params for params, _ in batch]), None)] * len(batch)
+            BATCH_SIZE.observe(len(batch))
+            if len(batch) > 1:
+                COALESCED.inc("write", amount=len(batch) - 1)
+        except Exception as e:
+            if len(batch) == 1:
+                outcomes = [(None, e)]
+            else:
+                outcomes = []
+                for params, _ in batch:
+                    BATCH_SIZE.observe(1)
+                    try:
+                        outcomes.append((await apply([params]), None))
+                    except Exception as single_error:
+                        outcomes.append((None, single_error))
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if future.done():  # The caller gave up waiting
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
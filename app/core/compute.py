@@ -0,0 +1,186 @@
+# File: app/core/compute.py
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import time
+import uuid
+
+
+class ComputePool:
+    """Runs blocking NumPy work off the event loop.
+
+    Threads suit this code, since NumPy releases the GIL in its heavy loops.
+    A process pool sidesteps the GIL entirely, but every argument and result
+    must be pickled and the spectrum cache is per process.
+    """
+
+    def __init__(self, kind: str = "thread", workers: Optional[int] = None):
+        self.kind = kind
+        self.workers = workers
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:  # Created on first use, after any fork
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="compute")
+        return self._executor
+
+    async def run(self, func: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def submit(self, func: Callable, *args) -> Future:
+        return self.executor.submit(func, *args)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _timed_call(func: Callable, args: tuple) -> tuple:
+    """Run func in a worker and report when it actually started and finished"""
+    started = time.time()
+    result = func(*args)
+    return started, time.time(), result
+
+
+class JobQueueFullError(Exception):
+    """Too many jobs are queued or running"""
+
+
+class Job:
+    """One submitted computation and its timings"""
+
+    __slots__ = ('job_id', 'kind', 'params', '_status', 'submitted_at', 'started_at',
+                 'finished_at', 'result', 'error', 'error_type', '_future', '_task')
+
+    def __init__(self, kind: str, params: Dict):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self._status = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.error_type: Optional[str] = None
+        self._future: Optional[Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> str:
+        """queued, running, completed, failed or cancelled"""
+        if self._status == "queued" and self._future is not None and self._future.running():
+            return "running"
+        return self._status
+
+    @status.setter
+    def status(self, value: str) -> None:
+        self._status = value
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> Dict:
+        def elapsed_ms(start, end):
+            return None if start is None or end is None else (end - start) * 1000
+
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'params': self.params,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'queued_ms': elapsed_ms(self.submitted_at, self.started_at or self.finished_at),
+            'run_ms': elapsed_ms(self.started_at, self.finished_at),
+            'error': self.error,
+        }
+
+
+class JobManager:
+    """Background computations with a bounded queue and a bounded result history.
+
+    Cancelling a queued job removes it from the pool queue. A job that is
+    already running in a thread cannot be interrupted: it is reported as
+    cancelled at once, and its result is dropped when it finishes.
+    """
+
+    def __init__(self, pool: ComputePool, max_queue: int = 64, max_finished: int = 1000):
+        self.pool = pool
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self._jobs: OrderedDict = OrderedDict()  # Oldest first
+        self._active = 0
+
+    def submit(self, kind: str, params: Dict, func: Callable, *args) -> Job:
+        if self._active >= self.max_queue:
+            raise JobQueueFullError(f"Job queue is full ({self.max_queue} jobs pending)")
+        job = Job(kind, params)
+        job._future = self.pool.submit(_timed_call, func, args)
+        job._task = asyncio.get_running_loop().create_task(self._run(job))
+        job._task.add_done_callback(self._finished)
+        self._jobs[job.job_id] = job
+        self._active += 1
+        self._prune()
+        return job
+
+    async def _run(self, job: Job) -> None:
+        try:
+            job.started_at, job.finished_at, job.result = await asyncio.wrap_future(job._future)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            job.finished_at = time.time()
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.error_type = type(e).__name__
+            job.finished_at = time.time()
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self._active -= 1
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond max_finished"""
+        finished = len(self._jobs) - self._active
+        for job_id in list(self._jobs):
+            if finished <= self.max_finished:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+                finished -= 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Wait up to timeout seconds for the job to finish"""
+        if not job.done and timeout > 0:
+            await asyncio.wait({job._task}, timeout=timeout)
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        """Cancel a job that has not finished yet"""
+        if job.done:
+            return False
+        job._future.cancel()  # Succeeds only while the job is still queued
+        job._task.cancel()
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        return True
+
+    def stats(self) -> Dict:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {'active': self._active, 'max_queue': self.max_queue,
+                'pool': self.pool.kind, 'workers': self.pool.workers, **counts}
@@ -1,6 +1,6 @@
 from functools import lru_cache
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal, Optional
 from pydantic import ConfigDict
 
 class Settings(BaseSettings):
@@ -8,6 +8,33 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "String Theory Dashboard"
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:8000", "http://localhost:3000"]
     REDIS_URL: str = "redis://redis:6379"
+    STATE_BACKEND: Literal["memory", "redis"] = "memory"
+    REDIS_POOL_SIZE: int = 20
+    REDIS_KEY_PREFIX: str = "cats-cradle"
+    MAX_SWEEP_POINTS: int = 100_000
+    MAX_TEMPERATURE_POINTS: int = 100_000
+    MAX_INLINE_SPECTRUM_LEVEL: int = 100_000
+    MAX_DOWNSAMPLED_SPECTRUM_LEVEL: int = 10_000_000  # With max_points, larger spectra are allowed
+    MAX_STREAM_SPECTRUM_LEVEL: int = 10_000_000
+    SPECTRUM_BLOCK_SIZE: int = 65536
+    SPECTRUM_TABLE_PATH: Optional[str] = None  # Precomputed table, see app/models/spectrum_table.py
+    SPECTRUM_TABLE_INTERPOLATE: bool = False  # Interpolate tension/alpha_prime between grid values
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+    MAX_SESSIONS: int = 10_000
+    SESSION_IDLE_SECONDS: float = 3600.0
+    UPDATE_BATCH_WINDOW: float = 0.0  # Seconds to wait for more writes to merge into a batch
+    HISTORY_SIZE: int = 1000  # Versions kept per session; 0 disables history
+    COMPUTE_EXECUTOR: Literal["thread", "process"] = "thread"
+    COMPUTE_WORKERS: Optional[int] = None  # Defaults to the executor's own choice
+    OFFLOAD_SPECTRUM_LEVEL: int = 10_000  # Larger inline spectra run off the event loop
+    OFFLOAD_SWEEP_VALUES: int = 100_000  # Same for sweeps with more spectrum values
+    OFFLOAD_DEGENERACY_LEVELS: int = 500  # Same when this many level counts are not cached yet
+    MAX_JOB_QUEUE: int = 64
+    MAX_FINISHED_JOBS: int = 100
+    MAX_JOB_SPECTRUM_LEVEL: int = 1_000_000
+    PROFILING_ENABLED: bool = False  # Profile requests sending an X-Profile header
+    PROFILE_SAMPLE_RATE: float = 0.0  # Fraction of all requests profiled at random
+    PROFILE_HISTORY: int = 20
 
     model_config = ConfigDict(
         case_sensitive=True
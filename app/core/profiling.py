@@ -0,0 +1,86 @@
+# File: app/core/profiling.py
+from collections import deque
+from datetime import datetime
+from typing import Dict
+import cProfile
+import io
+import pstats
+import random
+import time
+import uuid
+
+PROFILE_HEADER = b"x-profile"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running selected requests under cProfile.
+
+    A request is profiled when it sends an `X-Profile: 1` header (if
+    allow_header is set) or is picked at random with probability
+    sample_rate. The cProfile summary is appended to profiles, a bounded
+    deque of recent profiles, and the response gets an `X-Profile-Id` header
+    pointing to it.
+
+    Only install this middleware when profiling is enabled: requests that
+    are not profiled still pay for the header scan and the sampling draw.
+    The profiler sees everything the event loop runs while the request is in
+    flight, so only one request is profiled at a time.
+    """
+
+    def __init__(self, app, profiles: deque, sample_rate: float = 0.0,
+                 allow_header: bool = False, top: int = 30):
+        self.app = app
+        self.profiles = profiles
+        self.sample_rate = sample_rate
+        self.allow_header = allow_header
+        self.top = top
+        self._active = False
+
+    def _wanted(self, scope) -> bool:
+        if self.allow_header:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER and value not in (b"0", b"false"):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        profile_id = uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = dict(message, headers=[*message.get("headers", []),
+                                                 (b"x-profile-id", profile_id.encode())])
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            self._active = False
+            self.profiles.append(self._summary(profiler, profile_id, scope, status,
+                                               time.perf_counter() - start))
+
+    def _summary(self, profiler: cProfile.Profile, profile_id: str, scope,
+                 status: int, duration: float) -> Dict:
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        return {
+            'id': profile_id,
+            'method': scope["method"],
+            'path': scope["path"],
+            'status': status,
+            'duration_ms': duration * 1000,
+            'timestamp': datetime.utcnow().isoformat(),
+            'summary': out.getvalue(),
+        }
@@ -0,0 +1,113 @@
+# File: app/core/serialization.py
+from typing import Any, Optional
+import json
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are then not offered
+    msgpack = None
+
+JSON_TYPE = "application/json"
+BINARY_TYPE = "application/octet-stream"
+MSGPACK_TYPE = "application/msgpack"
+_MEDIA_FORMATS = {
+    JSON_TYPE: "json",
+    BINARY_TYPE: "binary",
+    MSGPACK_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON-encode content; NumPy arrays are written straight from their buffers"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=_json_default,
+                                option=orjson.OPT_SERIALIZE_NUMPY)
+        except orjson.JSONEncodeError:
+            # e.g. exact degeneracies beyond 64 bits: encode members separately
+            # so only the offending one takes the slow path
+            if isinstance(content, dict):
+                return b"{%s}" % b",".join(orjson.dumps(str(key)) + b":" + dumps(value)
+                                           for key, value in content.items())
+    return json.dumps(content, default=_json_default).encode()
+
+
+def float_buffer(values: np.ndarray) -> memoryview:
+    """Little-endian float64 view of values, copying only if the layout differs"""
+    return memoryview(np.ascontiguousarray(values, dtype='<f8')).cast('B')
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray) and obj.dtype.kind == 'f':
+        return float_buffer(obj)  # Packed as bin: raw little-endian float64
+    if isinstance(obj, int):
+        # Beyond 64 bits, e.g. exact degeneracies at high levels: a decimal string stays exact
+        return str(obj)
+    return _json_default(obj)
+
+
+def packb(content: Any) -> bytes:
+    """MessagePack-encode content; float arrays become raw float64 bin fields"""
+    return msgpack.packb(content, default=_msgpack_default)
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Preferred response format ("json", "binary" or "msgpack") for an Accept header"""
+    best, best_q = "json", 0.0
+    for item in (accept or "").split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        fmt = _MEDIA_FORMATS.get(media_type.lower())
+        if fmt is None or (fmt == "msgpack" and msgpack is None):
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded without revalidating it against a response model"""
+
+    media_type = JSON_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class BinaryResponse(Response):
+    """Float array sent as raw little-endian float64, one memcpy from the array buffer"""
+
+    media_type = BINARY_TYPE
+
+    def render(self, content: np.ndarray) -> bytes:
+        return bytes(float_buffer(content))
+
+
+class MsgpackResponse(Response):
+    media_type = MSGPACK_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
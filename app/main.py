@@ -1,17 +1,29 @@
 # File: app/main.py
-from fastapi import FastAPI
+from collections import deque
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from app.core.config import get_settings
+from app.core.metrics import REGISTRY, MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.api.deps import compute_pool, state_backend
 from app.api.v1.endpoints import string_theory
 import os
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    compute_pool.shutdown()
+    await state_backend.close()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -23,6 +35,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiling is only installed when enabled, so it costs nothing otherwise
+profiling_enabled = settings.PROFILING_ENABLED or settings.PROFILE_SAMPLE_RATE > 0
+profiles: deque = deque(maxlen=settings.PROFILE_HISTORY)
+if profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiles=profiles,
+        sample_rate=settings.PROFILE_SAMPLE_RATE,
+        allow_header=settings.PROFILING_ENABLED,
+    )
+
+# Outermost, so it also times CORS and profiling
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -35,4 +61,17 @@ app.include_router(
 
 @app.get("/")
 async def root():
-    return FileResponse('app/static/index.html')
\ No newline at end of file
+    return FileResponse('app/static/index.html')
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request, latency, error and hot-path timing metrics in the Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/metrics/profiles")
+async def recent_profiles():
+    """cProfile summaries of recently profiled requests, newest first"""
+    if not profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return {"status": "success", "data": list(reversed(profiles))}
\ No newline at end of file
@@ -0,0 +1,166 @@
+# File: app/models/degeneracy.py
+from functools import lru_cache
+from threading import Lock
+from typing import List, Literal
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TheoryType = Literal["bosonic", "superstring"]
+
+MAX_EXACT_LEVEL = 5_000  # Beyond this only the asymptotic log-degeneracy is offered
+LIMB_BITS = 16  # Exact integers are split into limbs this wide for float64 products
+LEVEL_BLOCK = 256  # Levels whose sums over earlier levels are one matrix product
+
+
+def _from_limbs(sums: np.ndarray) -> int:
+    """sum_i sums[i] 2^(16 i) for exact integer-valued floats below 2^64"""
+    values = sums.astype(np.uint64)
+    total = 0
+    for shift in range(0, 64, LIMB_BITS):
+        chunk = ((values >> np.uint64(shift)) & np.uint64(0xFFFF)).astype('<u2')
+        total += int.from_bytes(chunk.tobytes(), 'little') << shift
+    return total
+
+
+def _to_limbs(value: int) -> np.ndarray:
+    return np.frombuffer(value.to_bytes(2 * -(-value.bit_length() // LIMB_BITS), 'little'),
+                         dtype='<u2')
+
+
+class DegeneracySeries:
+    """Coefficients of prefactor * prod_{n>=1} (1 - q^n)^(-c_n) as exact integers.
+
+    Uses the Euler transform recurrence n a(n) = sum_j b(j) a(n - j) with
+    b(j) = sum_{d|j} d c_d. Coefficients are cached and extended on demand,
+    so asking for more levels reuses every term computed so far.
+
+    The sums run in float64 on 16-bit limbs of the coefficients, which is
+    exact while b(j) 2^16 n stays below 2^53 (always, up to MAX_EXACT_LEVEL).
+    For each block of levels, the part of the sums over earlier blocks is
+    one Toeplitz matrix product, so the quadratic work runs in BLAS rather
+    than as Python big-integer operations.
+    """
+
+    def __init__(self, transverse: int, odd_exponent: int, even_exponent: int,
+                 prefactor: int, growth: float):
+        self.transverse = transverse
+        self.odd_exponent = odd_exponent    # c_n for odd n
+        self.even_exponent = even_exponent  # c_n for even n
+        self.prefactor = prefactor
+        self.growth = growth                # A in log a(n) ~ A sqrt(n)
+        self._coefficients = np.ones(1, dtype=object)
+        self._log = np.zeros(1)
+        self._lock = Lock()
+
+    def _weights(self, max_level: int) -> np.ndarray:
+        """b(j) for j = 0..max_level, via a divisor sieve"""
+        b = np.zeros(max_level + 1, dtype=np.int64)
+        for d in range(1, max_level + 1):
+            c = self.odd_exponent if d % 2 else self.even_exponent
+            b[d::d] += d * c
+        return b.astype(object)
+
+    @property
+    def computed(self) -> int:
+        """Highest level whose count is already known"""
+        return len(self._coefficients) - 1
+
+    def _extend(self, max_level: int) -> None:
+        computed = self.computed
+        if max_level <= computed:
+            return
+        b = self._weights(max_level)
+        a = np.empty(max_level + 1, dtype=object)
+        a[:computed + 1] = self._coefficients
+        if max(b) << LIMB_BITS < 2 ** 53 // (max_level + 1):
+            self._extend_blocked(a, b.astype(np.float64), computed)
+        else:
+            for n in range(computed + 1, max_level + 1):
+                a[n] = np.dot(b[1:n + 1], a[n - 1::-1]) // n
+        log = np.empty(max_level + 1)
+        log[:computed + 1] = self._log
+        log[computed + 1:] = [math.log(x) for x in a[computed + 1:]]
+        self._coefficients, self._log = a, log
+
+    @staticmethod
+    def _extend_blocked(a: np.ndarray, b: np.ndarray, computed: int) -> None:
+        """Fill a[computed + 1:] in place; b as float64, all partial sums exact"""
+        max_level = len(a) - 1
+        limbs = np.zeros((max_level + 1, 8))
+        earlier = np.zeros((0, 8))
+
+        def store(n: int, value: int) -> None:
+            nonlocal limbs, earlier
+            digits = _to_limbs(value)
+            if digits.size > limbs.shape[1]:  # Widen everything holding limb columns
+                grow = ((0, 0), (0, max(limbs.shape[1], digits.size - limbs.shape[1])))
+                limbs, earlier = np.pad(limbs, grow), np.pad(earlier, grow)
+            limbs[n, :digits.size] = digits
+
+        for n in range(computed + 1):
+            store(n, int(a[n]))
+        reversed_b = b[::-1]
+        for start in range(computed + 1, max_level + 1, LEVEL_BLOCK):
+            stop = min(start + LEVEL_BLOCK, max_level + 1)
+            # Row n - start, column i: b(n - i) for the levels n of this block
+            windows = sliding_window_view(reversed_b, start)
+            toeplitz = windows[max_level - stop + 1:max_level - start + 1][::-1]
+            earlier = np.ascontiguousarray(toeplitz) @ limbs[:start]
+            for n in range(start, stop):
+                sums = earlier[n - start] + b[n - start:0:-1] @ limbs[start:n]
+                a[n] = _from_limbs(sums) // n
+                store(n, a[n])
+
+    def coefficients(self, max_level: int) -> List[int]:
+        """Exact state counts for levels 0..max_level"""
+        if max_level > MAX_EXACT_LEVEL:
+            raise ValueError(f"Exact degeneracies are limited to level {MAX_EXACT_LEVEL}")
+        with self._lock:
+            self._extend(max_level)
+            coefficients = self._coefficients[:max_level + 1]
+        return [self.prefactor * int(x) for x in coefficients]
+
+    def log_coefficients(self, max_level: int) -> np.ndarray:
+        """Natural log of the state counts for levels 0..max_level.
+
+        Exact up to MAX_EXACT_LEVEL; above it the asymptotic form
+        A sqrt(n) - (k + 3)/4 log n + C is used, with C matched to the last
+        exact level.
+        """
+        exact = min(max_level, MAX_EXACT_LEVEL)
+        with self._lock:
+            self._extend(exact)
+            log = self._log[:exact + 1] + math.log(self.prefactor)
+        if max_level <= exact:
+            return log
+        return np.concatenate([log, self.asymptotic_log(np.arange(exact + 1, max_level + 1),
+                                                        anchor=(exact, log[-1]))])
+
+    def asymptotic_log(self, levels: np.ndarray, anchor: tuple) -> np.ndarray:
+        """Meinardus asymptotics, shifted to pass through the anchor (level, log count)"""
+        # Both theories have D(0) = -k/2, giving the n^{-(k+3)/4} prefactor
+        power = (self.transverse + 3) / 4
+
+        def shape(n):
+            return self.growth * np.sqrt(n) - power * np.log(n)
+
+        level, value = anchor
+        return shape(levels) + (value - shape(level))
+
+
+@lru_cache(maxsize=None)
+def get_series(theory: TheoryType, transverse: int) -> DegeneracySeries:
+    """Level degeneracy series for transverse = D - 2 oscillator directions.
+
+    bosonic:     prod (1 - q^n)^(-k), the light-cone partition function
+    superstring: 2k * prod ((1 + q^n) / (1 - q^n))^k, bosons and fermions
+                 paired by supersymmetry (16, 256, 2304, ... in D = 10)
+    """
+    k = transverse
+    if theory == "bosonic":
+        return DegeneracySeries(k, k, k, 1, math.pi * math.sqrt(2 * k / 3))
+    if theory == "superstring":
+        # (1 + q^n) = (1 - q^2n) / (1 - q^n): exponent 2k on odd n, k on even n
+        return DegeneracySeries(k, 2 * k, k, 2 * k, math.pi * math.sqrt(k))
+    raise ValueError(f"Unsupported theory: {theory}")
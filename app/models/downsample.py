@@ -0,0 +1,67 @@
+# File: app/models/downsample.py
+from typing import Literal
+import numpy as np
+
+DownsampleMethod = Literal["lttb", "minmax"]
+
+
+def minmax(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the smallest and largest value in each of (max_points - 2) // 2 buckets.
+
+    Keeps every peak and trough, so a line through the points covers the
+    same pixels as one through all of y. Endpoints are always included.
+    """
+    n = y.size
+    buckets = max((max_points - 2) // 2, 1)
+    width = -(-n // buckets)
+    # Pad with the last value so the buckets form a rectangle
+    padded = np.concatenate([y, np.full(buckets * width - n, y[-1])]).reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    indices = np.concatenate([offsets + padded.argmin(axis=1),
+                              offsets + padded.argmax(axis=1), [0, n - 1]])
+    return np.unique(np.minimum(indices, n - 1))
+
+
+def lttb(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: max_points indices preserving the visual shape.
+
+    x is the index itself. Each bucket keeps the point forming the largest
+    triangle with the previous pick and the mean of the next bucket. The
+    selection is sequential, but each step is one vectorized bucket scan.
+    """
+    n = y.size
+    if max_points < 3:
+        return np.array([0, n - 1])[:max_points]
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    # Mean of every inner bucket, for the look-ahead term
+    sums = np.add.reduceat(y[:n - 1], edges[:-1]) if n > 2 else np.zeros(0)
+    counts = np.diff(edges)
+    means_y = np.append(sums / np.maximum(counts, 1), y[-1])
+    means_x = np.append((edges[:-1] + edges[1:] - 1) / 2, n - 1)
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if stop <= start:
+            selected[bucket + 1] = previous
+            continue
+        x = np.arange(start, stop)
+        next_x, next_y = means_x[bucket + 1], means_y[bucket + 1]
+        # Twice the triangle area; the sign does not matter
+        area = np.abs((previous - next_x) * (y[start:stop] - y[previous])
+                      - (previous - x) * (next_y - y[previous]))
+        previous = selected[bucket + 1] = start + int(area.argmax())
+    return np.unique(selected)
+
+
+def downsample(y: np.ndarray, max_points: int, method: DownsampleMethod = "lttb") -> np.ndarray:
+    """Indices of at most max_points values of y chosen by method; all of them if y fits"""
+    if y.size <= max_points:
+        return np.arange(y.size)
+    if method == "minmax":
+        return minmax(y, max_points)
+    if method == "lttb":
+        return lttb(y, max_points)
+    raise ValueError(f"Unsupported downsampling method: {method}")
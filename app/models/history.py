@@ -0,0 +1,140 @@
+# File: app/models/history.py
+from typing import Dict, Optional
+import time
+
+import numpy as np
+
+from app.models.string_theory import N_STATES, StringTheorySystem
+
+MAX_EXTRA_DIMS = 22  # 26 dimensions, 4 of them large
+_TOPOLOGIES = list(StringTheorySystem.TOPOLOGY_FACTORS)
+_INITIAL_ROWS = 16
+
+
+class StateHistory:
+    """Bounded ring buffer of past system states, stored column-wise.
+
+    Each version costs one row across fixed-width NumPy columns: scalars,
+    the radii padded to 22 entries, and the N_STATES-level spectrum, about
+    300 bytes in all. User-supplied metrics are immutable and shared, so a
+    row only holds a reference to them. Columns start small and double until
+    they reach capacity, after which the oldest versions are overwritten.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity < 1:
+            raise ValueError("History capacity must be positive")
+        self.capacity = capacity
+        self._start = 0  # Row of the oldest entry
+        self._size = 0
+        self._allocate(min(_INITIAL_ROWS, capacity))
+
+    def _allocate(self, rows: int) -> None:
+        columns = {
+            'version': np.zeros(rows, dtype=np.int64),
+            'timestamp': np.zeros(rows),
+            'dimensions': np.zeros(rows, dtype=np.uint8),
+            'topology': np.zeros(rows, dtype=np.uint8),
+            'tension': np.zeros(rows),
+            'coupling': np.zeros(rows),
+            'alpha_prime': np.zeros(rows),
+            'radius': np.zeros((rows, MAX_EXTRA_DIMS)),
+            'mass_spectrum': np.zeros((rows, N_STATES)),
+            'metrics': np.empty(rows, dtype=object),
+        }
+        if self._size:
+            order = self._order()
+            for name, column in columns.items():
+                column[:self._size] = self._columns[name][order]
+            self._start = 0
+        self._columns = columns
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _order(self) -> np.ndarray:
+        """Row indices from oldest to newest"""
+        rows = len(self._columns['version'])
+        return (self._start + np.arange(self._size)) % rows
+
+    def record(self, system: StringTheorySystem, timestamp: Optional[float] = None) -> None:
+        rows = len(self._columns['version'])
+        if self._size == rows and rows < self.capacity:
+            self._allocate(min(rows * 2, self.capacity))
+            rows = len(self._columns['version'])
+        if self._size < rows:
+            row = (self._start + self._size) % rows
+            self._size += 1
+        else:  # Full: overwrite the oldest
+            row = self._start
+            self._start = (self._start + 1) % rows
+
+        columns = self._columns
+        radius = system.compactification['radius']
+        columns['version'][row] = system.version
+        columns['timestamp'][row] = time.time() if timestamp is None else timestamp
+        columns['dimensions'][row] = system.dimensions
+        columns['topology'][row] = _TOPOLOGIES.index(system.compactification['topology'])
+        columns['tension'][row] = system.tension
+        columns['coupling'][row] = system.coupling
+        columns['alpha_prime'][row] = system.alpha_prime
+        columns['radius'][row, :len(radius)] = radius
+        columns['radius'][row, len(radius):] = 0
+        columns['mass_spectrum'][row] = system.mass_spectrum_array()
+        columns['metrics'][row] = system.metrics
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              max_points: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Columns for versions recorded between start and end (epoch seconds), oldest first.
+
+        With max_points, evenly spaced rows are kept, always including the
+        first and last in range.
+        """
+        order = self._order()
+        timestamps = self._columns['timestamp'][order]
+        selected = np.ones(order.size, dtype=bool)
+        if start is not None:
+            selected &= timestamps >= start
+        if end is not None:
+            selected &= timestamps <= end
+        rows = order[selected]
+        if max_points is not None and rows.size > max_points:
+            rows = rows[np.unique(np.linspace(0, rows.size - 1, max_points).round().astype(int))]
+
+        columns = self._columns
+        topology = np.asarray(_TOPOLOGIES, dtype=object)[columns['topology'][rows]]
+        return {
+            'version': columns['version'][rows],
+            'timestamp': columns['timestamp'][rows],
+            'dimensions': columns['dimensions'][rows].astype(np.int64),
+            'topology': topology,
+            'tension': columns['tension'][rows],
+            'coupling': columns['coupling'][rows],
+            'alpha_prime': columns['alpha_prime'][rows],
+            'mass_spectrum': columns['mass_spectrum'][rows],
+        }
+
+    def parameters(self, version: int) -> Optional[Dict]:
+        """Rebuild parameters of a recorded version, as StringTheorySystem.to_parameters()"""
+        order = self._order()
+        matches = order[self._columns['version'][order] == version]
+        if matches.size == 0:
+            return None
+        row = matches[-1]
+        columns = self._columns
+        dims = int(columns['dimensions'][row])
+        return {
+            'dimensions': dims,
+            'tension': float(columns['tension'][row]),
+            'coupling': float(columns['coupling'][row]),
+            'alpha_prime': float(columns['alpha_prime'][row]),
+            'topology': _TOPOLOGIES[columns['topology'][row]],
+            'radius': columns['radius'][row, :dims - 4].tolist(),
+            'metrics': {topology: metric.to_dict()
+                        for topology, metric in columns['metrics'][row].items()},
+            'version': int(columns['version'][row]),
+        }
+
+    def nbytes(self) -> int:
+        """Bytes held by the numeric columns"""
+        return sum(column.nbytes for column in self._columns.values())
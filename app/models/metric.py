@@ -0,0 +1,153 @@
+# File: app/models/metric.py
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+class CompactMetric:
+    """Metric on the compact dimensions, kept in its most compact form.
+
+    Diagonal metrics store only their d diagonal entries; the dense d x d
+    matrix is materialized on first use. Instances are immutable, so they
+    can be shared between systems, and the Cholesky factors computed while
+    validating are kept for every later use of the same metric.
+    """
+
+    __slots__ = ('size', '_diagonal', '_dense', '_factors', '_key')
+
+    def __init__(self, size: int, diagonal: Optional[np.ndarray] = None,
+                 dense: Optional[np.ndarray] = None):
+        if (diagonal is None) == (dense is None):
+            raise ValueError("Give exactly one of diagonal or dense")
+        self.size = size
+        self._diagonal = diagonal
+        self._dense = dense
+        self._factors: Dict[str, np.ndarray] = {}
+        self._key: Optional[tuple] = None
+
+    @classmethod
+    def identity(cls, size: int) -> "CompactMetric":
+        return _identity(size)
+
+    @classmethod
+    def from_diagonal(cls, values: Sequence[float]) -> "CompactMetric":
+        values = np.array(values, dtype=float)
+        if values.ndim != 1:
+            raise ValueError("Metric diagonal must be a list of numbers")
+        if not np.all(np.isfinite(values) & (values > 0)):
+            raise ValueError("Metric must be positive definite")
+        return cls(values.size, diagonal=_read_only(values))
+
+    @classmethod
+    def from_matrix(cls, matrix) -> "CompactMetric":
+        """Build from a symmetric positive-definite matrix, keeping only the diagonal when possible"""
+        matrix = np.array(matrix, dtype=float)
+        if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError("Metric must be a square matrix")
+        if not np.all(np.isfinite(matrix)):
+            raise ValueError("Metric entries must be finite")
+        diagonal = np.diag(matrix)
+        if np.count_nonzero(matrix - np.diag(diagonal)) == 0:
+            return cls.from_diagonal(diagonal)
+        scale = np.abs(matrix).max()
+        if not np.allclose(matrix, matrix.T, rtol=0, atol=1e-12 * scale):
+            raise ValueError("Metric must be symmetric")
+        matrix = (matrix + matrix.T) / 2
+        try:
+            factor = np.linalg.cholesky(matrix)
+        except np.linalg.LinAlgError:
+            raise ValueError("Metric must be positive definite")
+        metric = cls(matrix.shape[0], dense=_read_only(matrix))
+        metric._factors['metric'] = _read_only(factor)
+        return metric
+
+    @classmethod
+    def from_values(cls, values) -> "CompactMetric":
+        """Build from a diagonal (flat list) or a full matrix (nested lists)"""
+        if np.ndim(values) == 1:
+            return cls.from_diagonal(values)
+        return cls.from_matrix(values)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CompactMetric":
+        """Inverse of to_dict"""
+        if data['kind'] == "diagonal":
+            return cls.from_diagonal(data['diagonal'])
+        return cls.from_matrix(data['values'])
+
+    @property
+    def kind(self) -> str:
+        return "diagonal" if self._diagonal is not None else "dense"
+
+    def diagonal(self) -> np.ndarray:
+        if self._diagonal is not None:
+            return self._diagonal
+        return np.diag(self._dense)
+
+    def as_array(self) -> np.ndarray:
+        """Dense d x d matrix, materialized once"""
+        if self._dense is None:
+            self._dense = _read_only(np.diag(self._diagonal))
+        return self._dense
+
+    def cholesky(self) -> np.ndarray:
+        """Lower-triangular L with G = L L^T, factorized once per metric"""
+        factor = self._factors.get('metric')
+        if factor is None:
+            if self._diagonal is not None:
+                factor = np.diag(np.sqrt(self._diagonal))
+            else:
+                factor = np.linalg.cholesky(self._dense)
+            factor = self._factors['metric'] = _read_only(factor)
+        return factor
+
+    def inverse_cholesky(self) -> np.ndarray:
+        """Lower-triangular L with G^-1 = L L^T, factorized once per metric"""
+        factor = self._factors.get('inverse')
+        if factor is None:
+            if self._diagonal is not None:
+                factor = np.diag(1 / np.sqrt(self._diagonal))
+            else:
+                # G^-1 = L^-T L^-1, refactorized into lower-triangular form
+                inverse = np.linalg.inv(self.cholesky())
+                factor = np.linalg.cholesky(inverse.T @ inverse)
+            factor = self._factors['inverse'] = _read_only(factor)
+        return factor
+
+    def cache_key(self) -> tuple:
+        """Hashable fingerprint of the metric values, for result caches"""
+        if self._key is None:
+            values = self._diagonal if self._diagonal is not None else self._dense
+            self._key = (self.kind, self.size, values.tobytes())
+        return self._key
+
+    def to_dict(self) -> Dict:
+        """Serialized form; size grows with d for diagonal metrics, not d^2"""
+        if self.kind == "diagonal":
+            return {'kind': "diagonal", 'size': self.size,
+                    'diagonal': self._diagonal.tolist()}
+        return {'kind': "dense", 'size': self.size, 'values': self._dense.tolist()}
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CompactMetric):
+            return NotImplemented
+        if self.size != other.size:
+            return False
+        if self.kind == other.kind == "diagonal":
+            return np.array_equal(self._diagonal, other._diagonal)
+        return np.array_equal(self.as_array(), other.as_array())
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"CompactMetric(kind={self.kind!r}, size={self.size})"
+
+
+@lru_cache(maxsize=None)
+def _identity(size: int) -> CompactMetric:
+    return CompactMetric.from_diagonal(np.ones(size))
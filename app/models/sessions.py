@@ -0,0 +1,190 @@
+# File: app/models/sessions.py
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Sequence, Union
+import asyncio
+import re
+import sys
+import time
+import uuid
+import logging
+
+import numpy as np
+
+from app.core.broadcast import Broadcaster
+from app.models.history import StateHistory
+from app.models.string_theory import StringTheorySystem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_ID = "default"
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Session:
+    """One independent simulation. Lock, broadcaster and history are created on first use."""
+
+    __slots__ = ('session_id', 'epoch', 'system', 'last_access', 'history_size',
+                 '_lock', '_broadcaster', '_history')
+
+    def __init__(self, session_id: str, system: Optional[StringTheorySystem] = None,
+                 history_size: int = 1000):
+        self.session_id = session_id
+        self.epoch = uuid.uuid4().hex[:8]  # Distinguishes re-created sessions
+        self.system = system if system is not None else StringTheorySystem()
+        self.last_access = time.monotonic()
+        self.history_size = history_size
+        self._lock: Optional[asyncio.Lock] = None
+        self._broadcaster: Optional[Broadcaster] = None
+        self._history: Optional[StateHistory] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    @property
+    def broadcaster(self) -> Broadcaster:
+        if self._broadcaster is None:
+            self._broadcaster = Broadcaster()
+        return self._broadcaster
+
+    @property
+    def history(self) -> Optional[StateHistory]:
+        """Recent versions of this session, starting from the current one; None if disabled"""
+        if self._history is None and self.history_size > 0:
+            self._history = StateHistory(self.history_size)
+            self._history.record(self.system)
+        return self._history
+
+    def record(self, system: StringTheorySystem) -> None:
+        """Add a newly applied version to the history; call before making it current"""
+        history = self.history
+        if history is not None:
+            history.record(system)
+
+    @property
+    def has_subscribers(self) -> bool:
+        return self._broadcaster is not None and len(self._broadcaster) > 0
+
+    @property
+    def busy(self) -> bool:
+        return self._lock is not None and self._lock.locked()
+
+    async def update(self, params: Union[Dict, Sequence[Dict]]) -> StringTheorySystem:
+        """Apply params atomically: on failure the session keeps its old state.
+
+        A no-op update returns the current system unchanged; a sequence of
+        params is applied in order as one new version.
+        """
+        async with self.lock:
+            candidate = self.system.copy()
+            if candidate.update_parameters(params):
+                self.record(candidate)
+                self.system = candidate
+            return self.system
+
+
+class SessionStore:
+    """Session-keyed systems with idle-time and LRU eviction.
+
+    The default session is pinned and never evicted.
+    """
+
+    def __init__(self, max_sessions: int = 10_000, idle_timeout: float = 3600.0,
+                 history_size: int = 1000):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.history_size = history_size
+        self.evictions = 0
+        self._sessions: OrderedDict = OrderedDict()  # Least recently used first
+        self._mutex = Lock()
+        self.default = Session(DEFAULT_SESSION_ID, history_size=history_size)
+
+    def get(self, session_id: Optional[str] = None,
+            create: bool = True) -> Optional[Session]:
+        """Return the session, creating it on first access unless create is False"""
+        if session_id is None or session_id == DEFAULT_SESSION_ID:
+            self.default.last_access = time.monotonic()
+            return self.default
+        if not SESSION_ID_PATTERN.match(session_id):
+            raise ValueError("Session id must be 1-64 characters of [A-Za-z0-9_-]")
+
+        now = time.monotonic()
+        with self._mutex:
+            session = self._sessions.get(session_id)
+            if session is None:
+                if not create:
+                    return None
+                session = self._sessions[session_id] = Session(
+                    session_id, history_size=self.history_size)
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_access = now
+            self._evict(now)
+        return session
+
+    def create(self) -> Session:
+        return self.get(uuid.uuid4().hex)
+
+    def delete(self, session_id: str) -> bool:
+        with self._mutex:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict(self, now: float) -> None:
+        """Drop idle sessions, then the least recently used beyond capacity"""
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            idle = now - session.last_access > self.idle_timeout
+            if not idle and len(self._sessions) <= self.max_sessions:
+                break
+            if session.busy:
+                # Never drop a session in the middle of an update
+                self._sessions.move_to_end(session_id)
+                if all(s.busy for s in self._sessions.values()):
+                    break
+                continue
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def session_ids(self) -> list:
+        with self._mutex:
+            return [DEFAULT_SESSION_ID, *self._sessions]
+
+    def __len__(self) -> int:
+        return len(self._sessions) + 1
+
+    def memory_report(self) -> Dict:
+        """Approximate memory held by sessions, counting shared objects once"""
+        seen: set = set()
+        with self._mutex:
+            sessions = [self.default, *self._sessions.values()]
+        total = sum(_deep_sizeof(session, seen) for session in sessions)
+        return {
+            'sessions': len(sessions),
+            'max_sessions': self.max_sessions,
+            'idle_timeout': self.idle_timeout,
+            'evictions': self.evictions,
+            'total_bytes': total,
+            'bytes_per_session': total // len(sessions),
+        }
+
+
+def _deep_sizeof(obj, seen: set) -> int:
+    """sys.getsizeof summed over containers, slots and instance attributes"""
+    if id(obj) in seen or isinstance(obj, type):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, np.ndarray):
+        return size
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += _deep_sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        size += _deep_sizeof(getattr(obj, slot, None), seen)
+    return size
@@ -0,0 +1,246 @@
+# File: app/models/spectrum_table.py
+"""Precomputed spectra on disk, memory-mapped and shared by every worker.
+
+    python -m app.models.spectrum_table --output spectra.table \\
+        --tensions 0.5,1,2 --alpha-primes 0.5,1,2 --levels 1000
+
+Layout: an 8-byte magic, the format version and header length as uint32,
+a JSON header describing the grid and where each array starts, then the
+arrays as raw little-endian float64, each 64-byte aligned.
+"""
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, Optional, Sequence
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+MAGIC = b"CCSPECT\0"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<8sII')
+_ALIGN = 64
+THEORIES = ("superstring", "bosonic")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+class SpectrumTable:
+    """Read-only view of a table file.
+
+    Opening reads only the header: the arrays are memory-mapped, so their
+    pages are loaded on first access and shared through the page cache by
+    every process that maps the same file. Lookups are dictionary hits on
+    the grid axes. With interpolate, tension and alpha_prime between grid
+    values are interpolated geometrically, which is exact for the power
+    laws of the mass formula.
+    """
+
+    def __init__(self, path: str, interpolate: bool = False):
+        self.path = path
+        self.interpolate = interpolate
+        with open(path, 'rb') as f:
+            magic, version, header_size = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a spectrum table")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Spectrum table format {version} is not supported "
+                                 f"(expected {FORMAT_VERSION}); rebuild it")
+            header = json.loads(f.read(header_size))
+        self.header = header
+        self.n_levels = header['levels']
+        self.topology_factors: Dict[str, float] = header['topology_factors']
+        self._axes = {name: {value: i for i, value in enumerate(header[name])}
+                      for name in ('dimensions', 'topologies', 'tensions', 'alpha_primes')}
+        self._sorted = {name: sorted(header[name]) for name in ('tensions', 'alpha_primes')}
+        self._arrays = {
+            name: np.memmap(path, dtype='<f8', mode='r', offset=spec['offset'],
+                            shape=tuple(spec['shape']))
+            for name, spec in header['arrays'].items()
+        }
+        self.hits = 0
+        self.interpolated = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _bracket(self, axis: str, value: float):
+        """(low index, high index, weight of high) around value, or None outside the grid"""
+        values = self._sorted[axis]
+        position = bisect_left(values, value)
+        if position == 0 or position == len(values):
+            return None
+        low, high = values[position - 1], values[position]
+        weight = np.log(value / low) / np.log(high / low)
+        return self._axes[axis][low], self._axes[axis][high], weight
+
+    def mass_spectrum(self, dimensions: int, topology: str, tension: float,
+                      alpha_prime: float, max_level: int) -> Optional[np.ndarray]:
+        """Masses of levels 0..max_level, or None if the table does not cover them"""
+        d = self._axes['dimensions'].get(dimensions)
+        t = self._axes['topologies'].get(topology)
+        if d is None or t is None or max_level >= self.n_levels:
+            self._count('misses')
+            return None
+        spectra = self._arrays['mass_spectrum']
+        i = self._axes['tensions'].get(tension)
+        j = self._axes['alpha_primes'].get(alpha_prime)
+        if i is not None and j is not None:
+            self._count('hits')
+            return np.asarray(spectra[d, t, i, j, :max_level + 1])
+        if not self.interpolate:
+            self._count('misses')
+            return None
+
+        # Bilinear in log space over the axes that are off the grid
+        corners = []
+        for axis, index, value in (('tensions', i, tension), ('alpha_primes', j, alpha_prime)):
+            bracket = (index, index, 0.0) if index is not None else self._bracket(axis, value)
+            if bracket is None:
+                self._count('misses')
+                return None
+            corners.append(bracket)
+        (i0, i1, wi), (j0, j1, wj) = corners
+        block = spectra[d, t][:, :, :max_level + 1]
+        masses = (block[i0, j0] ** ((1 - wi) * (1 - wj)) * block[i1, j0] ** (wi * (1 - wj))
+                  * block[i0, j1] ** ((1 - wi) * wj) * block[i1, j1] ** (wi * wj))
+        self._count('interpolated')
+        return masses
+
+    def log_degeneracy(self, theory: str, dimensions: int,
+                       max_level: int) -> Optional[np.ndarray]:
+        """Natural-log state counts of levels 0..max_level, or None if not covered"""
+        if theory not in THEORIES or 'log_degeneracy' not in self._arrays:
+            return None
+        d = self._axes['dimensions'].get(dimensions)
+        if d is None or max_level >= self.n_levels:
+            return None
+        return np.asarray(self._arrays['log_degeneracy'][THEORIES.index(theory), d,
+                                                         :max_level + 1])
+
+    def stats(self) -> Dict:
+        return {
+            'path': self.path,
+            'levels': self.n_levels,
+            'points': int(np.prod(self._arrays['mass_spectrum'].shape[:-1])),
+            'bytes': sum(array.nbytes for array in self._arrays.values()),
+            'hits': self.hits,
+            'interpolated': self.interpolated,
+            'misses': self.misses,
+        }
+
+
+def build_table(path: str, tensions: Sequence[float], alpha_primes: Sequence[float],
+                levels: int, dimensions: Sequence[int] = range(4, 27)) -> Dict:
+    """Precompute spectra and log degeneracies for the grid and write them to path.
+
+    The file is written next to path and renamed into place, so workers
+    never map a half-written table.
+    """
+    from app.models.degeneracy import get_series
+    from app.models.string_theory import StringTheorySystem, mass_levels
+
+    topology_factors = dict(StringTheorySystem.TOPOLOGY_FACTORS)
+    dimensions = sorted({int(d) for d in dimensions})
+    tensions = sorted({float(t) for t in tensions})
+    alpha_primes = sorted({float(a) for a in alpha_primes})
+    if levels < 1 or not dimensions or not tensions or not alpha_primes:
+        raise ValueError("The grid must have at least one value on every axis")
+    if not all(4 <= d <= 26 for d in dimensions):
+        raise ValueError("Dimensions must be between 4 and 26")
+    if not all(v > 0 for v in tensions + alpha_primes):
+        raise ValueError("Tension and alpha prime must be positive")
+
+    shapes = {
+        'mass_spectrum': (len(dimensions), len(topology_factors), len(tensions),
+                          len(alpha_primes), levels),
+        'log_degeneracy': (len(THEORIES), len(dimensions), levels),
+    }
+    header = {
+        'levels': levels,
+        'dimensions': dimensions,
+        'topologies': list(topology_factors),
+        'tensions': tensions,
+        'alpha_primes': alpha_primes,
+        'topology_factors': topology_factors,
+        'theories': list(THEORIES),
+        'arrays': {},
+    }
+    # Offsets depend on the header size, which depends on the offsets: iterate to a fixed point
+    start = None
+    while True:
+        header_bytes = json.dumps(header).encode()
+        data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+        if data_start == start:
+            break
+        start = offset = data_start
+        for name, shape in shapes.items():
+            header['arrays'][name] = {'offset': offset, 'shape': list(shape)}
+            offset = _aligned(offset + 8 * int(np.prod(shape)))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.truncate(offset)
+        arrays = {name: np.memmap(temporary, dtype='<f8', mode='r+',
+                                  offset=header['arrays'][name]['offset'], shape=shape)
+                  for name, shape in shapes.items()}
+
+        n = np.arange(levels)
+        factors = np.array(list(topology_factors.values()))
+        for d, dims in enumerate(dimensions):
+            # One broadcast per dimension: topologies x tensions x alpha_primes x levels
+            arrays['mass_spectrum'][d] = mass_levels(
+                n, dims, np.array(tensions)[None, :, None, None],
+                np.array(alpha_primes)[None, None, :, None], factors[:, None, None, None])
+            for k, theory in enumerate(THEORIES):
+                arrays['log_degeneracy'][k, d] = get_series(theory, dims - 2).log_coefficients(
+                    levels - 1)
+        for array in arrays.values():
+            array.flush()
+        del arrays
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return header
+
+
+def _float_list(value: str) -> list:
+    return [float(item) for item in value.split(',') if item]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build a precomputed spectrum table")
+    parser.add_argument("--output", required=True, help="Table file to write")
+    parser.add_argument("--tensions", type=_float_list, default=[0.5, 1.0, 1.5, 2.0])
+    parser.add_argument("--alpha-primes", type=_float_list, default=[0.5, 1.0, 1.5, 2.0])
+    parser.add_argument("--levels", type=int, default=1000,
+                        help="Mass levels per spectrum (0..levels-1)")
+    parser.add_argument("--dimensions", type=lambda v: [int(d) for d in v.split(',') if d],
+                        default=list(range(4, 27)))
+    args = parser.parse_args(argv)
+    header = build_table(args.output, args.tensions, args.alpha_primes, args.levels,
+                         args.dimensions)
+    size = os.path.getsize(args.output)
+    print(f"Wrote {args.output}: {len(header['dimensions'])} dimensions x "
+          f"{len(header['topologies'])} topologies x {len(header['tensions'])} tensions x "
+          f"{len(header['alpha_primes'])} alpha_primes x {header['levels']} levels, "
+          f"{size / 1e6:.1f} MB", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+# File: app/models/state_backend.py
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Union
+import asyncio
+import struct
+import time
+import uuid
+import logging
+
+import numpy as np
+
+from app.models.history import StateHistory
+from app.models.sessions import DEFAULT_SESSION_ID, Session, SessionStore
+from app.models.string_theory import StringTheorySystem
+
+logger = logging.getLogger(__name__)
+
+# Called with (session, system) when another worker changed a watched session
+RemoteUpdateHook = Callable[[Session, StringTheorySystem], None]
+
+
+class StateConflictError(Exception):
+    """A version-checked update kept losing to concurrent writers"""
+
+
+class MemoryStateBackend:
+    """Session state held in this process only"""
+
+    name = "memory"
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+        self.on_remote_update: Optional[RemoteUpdateHook] = None
+
+    async def get_session(self, session_id: Optional[str] = None) -> Session:
+        return self.store.get(session_id)
+
+    async def create_session(self) -> Session:
+        return self.store.create()
+
+    async def delete_session(self, session_id: str) -> bool:
+        return self.store.delete(session_id)
+
+    async def update(self, session: Session, params: Union[Dict, Sequence[Dict]]) -> StringTheorySystem:
+        return await session.update(params)
+
+    async def history(self, session: Session) -> Optional[StateHistory]:
+        """Recent versions of the session; None if history is disabled"""
+        return session.history
+
+    def memory_report(self) -> Dict:
+        return {'backend': self.name, **self.store.memory_report()}
+
+    async def close(self) -> None:
+        pass
+
+
+# Record layout: format, version, dimensions, topology index, tension,
+# coupling, alpha_prime, then one float64 radius per extra dimension.
+# Format 2 appends each user-supplied metric: topology index, kind
+# (0 diagonal, 1 dense), then d or d*d float64 values. Format 3 inserts
+# the session epoch, 8 ASCII bytes, between the header and the radii, and
+# adds the size d to each metric header: metrics kept for other topologies
+# may belong to another dimension count than the current one.
+_RECORD_FORMAT = 3
+_HEADER = struct.Struct('<BQBBddd')
+_EPOCH = struct.Struct('<8s')
+_METRIC_HEADER_V2 = struct.Struct('<BB')
+_METRIC_HEADER = struct.Struct('<BBB')
+_TOPOLOGIES = list(StringTheorySystem.TOPOLOGY_FACTORS)
+_METRIC_KINDS = ["diagonal", "dense"]
+# History entries: the epoch seconds the version was written at, then its record
+_TIMESTAMP = struct.Struct('<d')
+
+
+def encode_system(system: StringTheorySystem, epoch: str = "") -> bytes:
+    """Compact binary encoding of the parameters a system is rebuilt from"""
+    params = system.to_parameters()
+    header = _HEADER.pack(_RECORD_FORMAT, params['version'], params['dimensions'],
+                          _TOPOLOGIES.index(params['topology']), params['tension'],
+                          params['coupling'], params['alpha_prime'])
+    parts = [header, _EPOCH.pack(epoch.encode('ascii')),
+             np.asarray(params['radius'], dtype='<f8').tobytes()]
+    for topology, metric in system.metrics.items():
+        values = metric.diagonal() if metric.kind == "diagonal" else metric.as_array()
+        parts.append(_METRIC_HEADER.pack(_TOPOLOGIES.index(topology),
+                                         _METRIC_KINDS.index(metric.kind), metric.size))
+        parts.append(np.asarray(values, dtype='<f8').tobytes())
+    return b''.join(parts)
+
+
+def _radius_offset(record_format: int) -> int:
+    return _HEADER.size + (_EPOCH.size if record_format >= 3 else 0)
+
+
+def record_epoch(data: bytes) -> Optional[str]:
+    """Session epoch stored in a record; None for records written before format 3"""
+    if data[0] < 3:
+        return None
+    return _EPOCH.unpack_from(data, _HEADER.size)[0].rstrip(b'\0').decode('ascii') or None
+
+
+def decode_system(data: bytes) -> StringTheorySystem:
+    (record_format, version, dimensions, topology,
+     tension, coupling, alpha_prime) = _HEADER.unpack_from(data)
+    if record_format not in (1, 2, _RECORD_FORMAT):
+        raise ValueError(f"Unsupported state record format: {record_format}")
+    size = dimensions - 4
+    radius_offset = _radius_offset(record_format)
+    offset = radius_offset + 8 * size
+    metrics = {}
+    while offset < len(data):
+        if record_format >= 3:
+            metric_topology, kind, metric_size = _METRIC_HEADER.unpack_from(data, offset)
+            offset += _METRIC_HEADER.size
+        else:
+            (metric_topology, kind), metric_size = _METRIC_HEADER_V2.unpack_from(data, offset), size
+            offset += _METRIC_HEADER_V2.size
+        count = metric_size if _METRIC_KINDS[kind] == "diagonal" else metric_size ** 2
+        values = np.frombuffer(data, dtype='<f8', count=count, offset=offset)
+        offset += 8 * count
+        metrics[_TOPOLOGIES[metric_topology]] = (
+            {'kind': "diagonal", 'diagonal': values} if _METRIC_KINDS[kind] == "diagonal"
+            else {'kind': "dense", 'values': values.reshape(metric_size, metric_size)})
+    return StringTheorySystem.from_parameters({
+        'dimensions': dimensions,
+        'tension': tension,
+        'coupling': coupling,
+        'alpha_prime': alpha_prime,
+        'topology': _TOPOLOGIES[topology],
+        'radius': np.frombuffer(data, dtype='<f8', count=size,
+                                offset=radius_offset).tolist(),
+        'metrics': metrics,
+        'version': version,
+    })
+
+
+class RedisStateBackend(MemoryStateBackend):
+    """Session state shared by all workers through Redis.
+
+    Each worker keeps a read-through cache of decoded sessions in its local
+    store. Writes are optimistic transactions (WATCH/MULTI) retried on
+    conflict, and announce the new version on a pub/sub channel so other
+    workers drop or refresh their cached copy. The session epoch is stored
+    in the record, so every worker issues the same ETags. Each version is
+    also added to the session's history, a sorted set by version next to
+    the record, so every worker lists and restores the same versions.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis, store: SessionStore, prefix: str = "cats-cradle",
+                 ttl: Optional[float] = None, max_retries: int = 10,
+                 connect: Optional[Callable[[], Any]] = None):
+        super().__init__(store)
+        self._redis = redis
+        self._connect = connect  # Creates a client; then one is made per event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.prefix = prefix
+        self.ttl = int(ttl) if ttl else None
+        self.max_retries = max_retries
+        self.channel = f"{prefix}:invalidate"
+        self.worker_id = uuid.uuid4().hex[:8]
+        self._stale = {DEFAULT_SESSION_ID}  # Loaded lazily from Redis
+        self._refreshed: Dict[str, float] = {}  # When this worker last extended a session's TTL
+        self._listener: Optional[asyncio.Task] = None
+        self._pubsub = None
+
+    @classmethod
+    def from_url(cls, url: str, store: SessionStore, pool_size: int = 20,
+                 **kwargs) -> "RedisStateBackend":
+        import redis.asyncio as aioredis
+
+        def connect():
+            pool = aioredis.ConnectionPool.from_url(url, max_connections=pool_size)
+            return aioredis.Redis(connection_pool=pool)
+
+        return cls(None, store, connect=connect, **kwargs)
+
+    @property
+    def redis(self):
+        """Client for the running event loop.
+
+        Connections and the listener task belong to the loop they were made
+        on, so a backend created at import time gets fresh ones on each new
+        loop (e.g. one per test) instead of failing with a loop mismatch.
+        """
+        if self._connect is not None:
+            loop = asyncio.get_running_loop()
+            if self._loop is not loop:
+                if self._listener is not None and not self._loop.is_closed():
+                    self._loop.call_soon_threadsafe(self._listener.cancel)
+                self._redis = self._connect()
+                self._loop = loop
+                self._listener = self._pubsub = None
+        return self._redis
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:session:{session_id}"
+
+    def _history_key(self, session_id: str) -> str:
+        return f"{self.prefix}:history:{session_id}"
+
+    def _add_history(self, pipe, session_id: str, record: bytes, version: int) -> None:
+        """Queue adding a version to the shared history, keeping the newest HISTORY_SIZE"""
+        size = self.store.history_size
+        if size <= 0:
+            return
+        key = self._history_key(session_id)
+        pipe.zadd(key, {_TIMESTAMP.pack(time.time()) + record: version})
+        pipe.zremrangebyrank(key, 0, -size - 1)
+        if self.ttl:
+            pipe.expire(key, self.ttl)
+
+    async def _ensure_listening(self) -> None:
+        redis = self.redis
+        if self._listener is None or self._listener.done():
+            self._pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(self.channel)
+            # Anything cached before we were listening may have missed updates
+            self._stale.update(self.store.session_ids())
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        async for message in self._pubsub.listen():
+            try:
+                worker_id, session_id, version = message['data'].decode().split(':')
+                if worker_id != self.worker_id:
+                    await self._on_remote_update(session_id, int(version))
+            except Exception as e:
+                logger.error(f"Error handling state invalidation: {str(e)}")
+
+    async def _on_remote_update(self, session_id: str, version: int) -> None:
+        if version == 0:
+            # Deleted by another worker; the pinned default can only be reloaded
+            if not self.store.delete(session_id):
+                self._stale.add(session_id)
+            return
+        session = self.store.get(session_id, create=False)
+        if session is None or session.system.version >= version:
+            return
+        if not session.has_subscribers:
+            self._stale.add(session_id)
+            return
+        # Someone on this worker is watching: refresh now and notify them
+        system, epoch = await self._load(session_id, session)
+        if system.version > session.system.version:
+            session.system = system
+            session.epoch = epoch or session.epoch
+        self._stale.discard(session_id)
+        if self.on_remote_update is not None:
+            self.on_remote_update(session, session.system)
+
+    def _touched(self, session_id: str) -> None:
+        self._refreshed[session_id] = time.monotonic()
+        if len(self._refreshed) > 2 * len(self.store):
+            # Forget sessions this worker no longer caches
+            cached = set(self.store.session_ids())
+            self._refreshed = {key: at for key, at in self._refreshed.items() if key in cached}
+
+    async def _refresh_ttl(self, session_id: str) -> None:
+        """Extend the shared expiry of a session served from the local cache.
+
+        Reads do not go to Redis, so without this a session that is only
+        polled would expire there while dashboards are still watching it.
+        At most one EXPIRE per session and worker per half TTL.
+        """
+        if self.ttl and time.monotonic() - self._refreshed.get(session_id, 0.0) > self.ttl / 2:
+            self._touched(session_id)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.expire(self._key(session_id), self.ttl)
+                pipe.expire(self._history_key(session_id), self.ttl)
+                await pipe.execute()
+
+    async def _load(self, session_id: str, local: Optional[Session] = None
+                    ) -> Tuple[StringTheorySystem, Optional[str]]:
+        """Read a session and its epoch, creating it if it does not exist.
+
+        A missing record is created from this worker's copy when it has one,
+        e.g. after the record expired, so its parameters and version survive.
+        """
+        key = self._key(session_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            if self.ttl:
+                pipe.expire(key, self.ttl)
+                pipe.expire(self._history_key(session_id), self.ttl)
+            data, *_ = await pipe.execute()
+        self._touched(session_id)
+        if data is not None:
+            return decode_system(data), record_epoch(data)
+
+        if local is not None:
+            system, epoch = local.system, local.epoch
+        else:
+            system, epoch = StringTheorySystem(), uuid.uuid4().hex[:8]
+        record = encode_system(system, epoch)
+        if await self.redis.set(key, record, ex=self.ttl, nx=True):
+            async with self.redis.pipeline(transaction=True) as pipe:
+                self._add_history(pipe, session_id, record, system.version)
+                await pipe.execute()
+            return system, epoch
+        data = await self.redis.get(key)  # Lost the race to create it
+        return decode_system(data), record_epoch(data)
+
+    async def get_session(self, session_id: Optional[str] = None) -> Session:
+        await self._ensure_listening()
+        session_id = session_id or DEFAULT_SESSION_ID
+        session = self.store.get(session_id, create=False)
+        if session is not None and session_id not in self._stale:
+            await self._refresh_ttl(session_id)
+            return session
+        system, epoch = await self._load(session_id, session)
+        session = self.store.get(session_id)
+        if system.version >= session.system.version:  # Never go back to an older version
+            session.system = system
+            session.epoch = epoch or session.epoch
+        self._stale.discard(session_id)
+        return session
+
+    async def create_session(self) -> Session:
+        return await self.get_session(uuid.uuid4().hex)
+
+    async def delete_session(self, session_id: str) -> bool:
+        self.store.delete(session_id)
+        self._refreshed.pop(session_id, None)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._key(session_id), self._history_key(session_id))
+            pipe.publish(self.channel, f"{self.worker_id}:{session_id}:0")
+            deleted, _ = await pipe.execute()
+        return bool(deleted)
+
+    async def update(self, session: Session, params: Union[Dict, Sequence[Dict]]) -> StringTheorySystem:
+        """Apply params (or a sequence of them, in order) on top of the latest
+        stored version, atomically, as one new version.
+
+        If the stored record is missing or older than this worker's copy
+        (it expired and was re-created with defaults), the update builds on
+        the local copy, so parameters are not lost and versions never go back.
+        """
+        from redis.exceptions import WatchError
+
+        await self._ensure_listening()
+        key = self._key(session.session_id)
+        async with session.lock:
+            for _ in range(self.max_retries):
+                try:
+                    async with self.redis.pipeline(transaction=True) as pipe:
+                        await pipe.watch(key)
+                        data = await pipe.get(key)
+                        current, epoch = session.system, session.epoch
+                        if data is not None:
+                            stored = decode_system(data)
+                            if stored.version > current.version:
+                                # Refresh the local copy even if this update is rejected
+                                current = session.system = stored
+                                epoch = session.epoch = record_epoch(data) or epoch
+                        candidate = current.copy()
+                        if not candidate.update_parameters(params):
+                            return session.system  # Nothing to write or announce
+
+                        pipe.multi()
+                        record = encode_system(candidate, epoch)
+                        pipe.set(key, record, ex=self.ttl)
+                        self._add_history(pipe, session.session_id, record, candidate.version)
+                        pipe.publish(self.channel, f"{self.worker_id}:"
+                                     f"{session.session_id}:{candidate.version}")
+                        await pipe.execute()
+                except WatchError:
+                    continue
+                session.system = candidate
+                self._stale.discard(session.session_id)
+                self._touched(session.session_id)
+                return candidate
+        raise StateConflictError("State changed concurrently, please retry")
+
+    async def history(self, session: Session) -> Optional[StateHistory]:
+        """The session's versions as every worker wrote them, read from Redis"""
+        if self.store.history_size <= 0:
+            return None
+        entries = await self.redis.zrange(self._history_key(session.session_id), 0, -1)
+        history = StateHistory(self.store.history_size)
+        for entry in entries:
+            history.record(decode_system(entry[_TIMESTAMP.size:]),
+                           _TIMESTAMP.unpack_from(entry)[0])
+        if not entries:  # Written before history was shared
+            history.record(session.system)
+        return history
+
+    def memory_report(self) -> Dict:
+        return {**super().memory_report(), 'stale_sessions': len(self._stale)}
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._redis is not None:
+            await self._redis.aclose()
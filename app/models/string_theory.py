@@ -1,13 +1,79 @@
 # File: app/models/string_theory.py
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
+import copy
 import numpy as np
-from typing import List, Dict, Literal
+from typing import List, Dict, Iterator, Literal, Optional, Sequence, Union
 import logging
+from app.core.cache import LRUCache
+from app.core.metrics import timed
+from app.models.degeneracy import MAX_EXACT_LEVEL, TheoryType, get_series
+from app.models.downsample import DownsampleMethod, downsample
+from app.models.metric import CompactMetric
+from app.models.spectrum_table import SpectrumTable
+from app.models.thermodynamics import (
+    hagedorn_temperature, log_density_of_states, thermodynamics
+)
+from app.models.tower import enumerate_tower
 
 logger = logging.getLogger(__name__)
 
 TopologyType = Literal["Calabi-Yau", "Torus", "Orbifold", "K3"]
 
+N_STATES = 10  # Number of mass levels in the spectrum (ground state included)
+SPECTRUM_BLOCK_SIZE = 65536  # Levels generated per block when streaming
+SPECTRUM_CACHE_SIZE = 256  # Spectra and serialized states kept in the LRU cache
+MAX_CACHED_LEVEL = 10_000  # Larger spectra are recomputed rather than cached
+THERMO_LEVELS = 1000  # Levels summed explicitly in thermodynamic quantities
+
+# Inputs each derived quantity is computed from. A result is cached under the
+# values of exactly these inputs, so changing anything else leaves it valid.
+DEPENDENCIES = {
+    'spectrum': ('dimensions', 'tension', 'alpha_prime', 'topology'),
+    'tower': ('dimensions', 'tension', 'alpha_prime', 'topology', 'radius', 'metric'),
+    'state': ('dimensions', 'tension', 'coupling', 'alpha_prime', 'topology',
+              'radius', 'metric'),
+}
+SCALAR_PARAMETERS = ('tension', 'coupling', 'alpha_prime')
+
+# Shared by all systems: entries are keyed on the physics inputs, so systems
+# with identical parameters reuse each other's results
+_cache = LRUCache(maxsize=SPECTRUM_CACHE_SIZE)
+
+
+# Precomputed spectra consulted before computing, see use_spectrum_table
+_table: Optional[SpectrumTable] = None
+
+
+def cache_stats() -> Dict[str, int]:
+    """Size and hit/miss counters of the spectrum and state cache"""
+    return _cache.stats()
+
+
+def use_spectrum_table(table: Optional[SpectrumTable]) -> None:
+    """Serve spectra and log degeneracies from a precomputed table when it covers them"""
+    global _table
+    if table is not None and table.topology_factors != StringTheorySystem.TOPOLOGY_FACTORS:
+        raise ValueError(f"{table.path} was built with other topology factors; rebuild it")
+    _table = table
+    _cache.clear()  # Entries computed before may now come from the table, and vice versa
+
+
+def spectrum_table_stats() -> Optional[Dict]:
+    return None if _table is None else _table.stats()
+
+
+def mass_levels(levels: np.ndarray, dimensions, tension, alpha_prime,
+                topology_factor) -> np.ndarray:
+    """Evaluate M = sqrt(n/alpha') * sqrt(T) * sqrt(D/10) * topology factor.
+
+    Parameters may be scalars or column vectors of shape (N, 1), in which case
+    the result broadcasts to an (N, n_states) array.
+    """
+    level_factor = np.sqrt(levels / alpha_prime)
+    tension_factor = np.sqrt(tension)
+    dimensional_factor = np.sqrt(np.asarray(dimensions) / 10)
+    return level_factor * tension_factor * dimensional_factor * topology_factor
+
 @dataclass
 class StringTheorySystem:
     dimensions: int = 10
@@ -25,9 +91,38 @@ class StringTheorySystem:
     }
 
     def __post_init__(self):
+        self._keys: Dict[str, tuple] = {}
+        self.version = 0  # Bumped by every update_parameters call that changes something
+        self.metrics: Dict[str, CompactMetric] = {}  # User-supplied metric per topology
+        self._validate()
         if self.compactification is None:
             self._reset_compactification()
-        self._validate()
+
+    def _input(self, name: str):
+        """Current value of one physics input, in hashable form"""
+        if name == 'topology':
+            return self.compactification['topology']
+        if name == 'radius':
+            return tuple(self.compactification['radius'])
+        if name == 'metric':
+            return self.compactification['metric'].cache_key()
+        return getattr(self, name)
+
+    def _invalidate(self, changed: Optional[set] = None) -> None:
+        """Forget cache keys that depend on any changed input (all of them by default)"""
+        # Rebuilt rather than mutated: copies share the dict until they diverge
+        self._keys = {} if changed is None else {
+            name: key for name, key in self._keys.items()
+            if changed.isdisjoint(DEPENDENCIES[name])
+        }
+
+    def _cache_key(self, name: str = 'state') -> tuple:
+        """Values of the inputs the named quantity depends on, memoized until one changes"""
+        key = self._keys.get(name)
+        if key is None:
+            key = tuple(self._input(dependency) for dependency in DEPENDENCIES[name])
+            self._keys = {**self._keys, name: key}
+        return key
 
     def _validate(self) -> None:
         """Validate all parameters"""
@@ -38,7 +133,6 @@ class StringTheorySystem:
         """Validate dimension constraints"""
         if not 4 <= self.dimensions <= 26:
             raise ValueError("Dimensions must be between 4 and 26")
-        self._reset_compactification()
 
     def _validate_physics_params(self) -> None:
         """Validate physical parameters"""
@@ -55,13 +149,36 @@ class StringTheorySystem:
         self.compactification = {
             'radius': [1.0] * extra_dims,  # One radius per extra dimension
             'topology': "Calabi-Yau",      # Default topology
-            'metric': self._generate_metric(extra_dims)
+            'metric': self._generate_metric(extra_dims, "Calabi-Yau")
         }
+        self._invalidate()
+
+    def _generate_metric(self, dims: int, topology: str,
+                         metrics: Optional[Dict[str, CompactMetric]] = None) -> CompactMetric:
+        """Metric for the compact dimensions under the given topology"""
+        metric = (self.metrics if metrics is None else metrics).get(topology)
+        if metric is not None and metric.size == dims:
+            return metric
+        # Default to the flat diagonal metric; shared, never materialized
+        return CompactMetric.identity(dims)
+
+    def set_metric(self, values, topology: Optional[TopologyType] = None) -> None:
+        """Use a symmetric positive-definite metric for a topology (default: the current one).
 
-    def _generate_metric(self, dims: int) -> List[List[float]]:
-        """Generate a simplified metric for the compact dimensions"""
-        # Start with diagonal metric (simple case)
-        return [[1.0 if i == j else 0.0 for j in range(dims)] for i in range(dims)]
+        values is either the diagonal or the full matrix. The metric is
+        factorized once while validating and reused by every calculation.
+        """
+        topology = topology or self.compactification['topology']
+        if topology not in self.TOPOLOGY_FACTORS:
+            raise ValueError(f"Unsupported topology: {topology}")
+        metric = CompactMetric.from_values(values)
+        dims = len(self.compactification['radius'])
+        if metric.size != dims:
+            raise ValueError(f"Metric must be {dims}x{dims} for {self.dimensions} dimensions")
+        self.metrics = {**self.metrics, topology: metric}
+        if topology == self.compactification['topology']:
+            self.compactification['metric'] = metric
+            self._invalidate({'metric'})
 
     def update_topology(self, topology: TopologyType) -> None:
         """Update the compactification topology"""
@@ -70,61 +187,393 @@ class StringTheorySystem:
         self.compactification['topology'] = topology
         # Regenerate metric based on new topology
         dims = len(self.compactification['radius'])
-        self.compactification['metric'] = self._generate_metric(dims)
+        self.compactification['metric'] = self._generate_metric(dims, topology)
+        self._invalidate({'topology', 'metric'})
 
-    def calculate_mass_spectrum(self) -> List[float]:
-        """Calculate mass spectrum with topology effects"""
-        try:
-            n_states = 10
-            n = np.arange(n_states)
-            
-            # Initialize masses array
-            masses = np.zeros_like(n, dtype=float)
-            
-            # Calculate for excited states (n > 0)
-            excited_states = n[1:]
-            dimensional_factor = np.sqrt(self.dimensions / 10)
+    @timed("mass_spectrum")
+    def mass_spectrum_array(self, max_level: Optional[int] = None) -> np.ndarray:
+        """Mass spectrum for levels 0..max_level as a read-only float64 array.
+
+        The array is shared with the cache rather than copied, so large
+        spectra can be encoded straight from its buffer.
+        """
+        if max_level is None:
+            max_level = N_STATES - 1
+        key = ('spectrum', self._cache_key('spectrum'), max_level)
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+        masses = None
+        if _table is not None:
+            masses = _table.mass_spectrum(self.dimensions, self.compactification['topology'],
+                                          self.tension, self.alpha_prime, max_level)
+        if masses is None:
+            n = np.arange(max_level + 1)
             topology_factor = self.TOPOLOGY_FACTORS[self.compactification['topology']]
-            
-            # Level factor with topology effects
-            level_factor = np.sqrt(excited_states / self.alpha_prime)
-            tension_factor = np.sqrt(self.tension)
-            
-            # Combine all factors for excited states
-            masses[1:] = (level_factor * tension_factor * 
-                         dimensional_factor * topology_factor)
-            
-            # Ground state remains at zero
-            masses[0] = 0.0
-            
-            return masses.tolist()
+            # Ground state (n = 0) stays at zero mass
+            masses = mass_levels(n, self.dimensions, self.tension,
+                                 self.alpha_prime, topology_factor)
+        masses.flags.writeable = False
+
+        if max_level <= MAX_CACHED_LEVEL:
+            _cache.put(key, masses)
+        return masses
+
+    def mass_spectrum_points(self, max_level: Optional[int], max_points: int,
+                             method: DownsampleMethod = "lttb") -> Dict[str, np.ndarray]:
+        """At most max_points (level, mass) pairs of the spectrum, chosen to keep its shape.
+
+        Cached like the spectrum itself, so polling clients share one
+        reduction even when the full spectrum is too large to cache.
+        """
+        if max_level is None:
+            max_level = N_STATES - 1
+        key = ('spectrum', self._cache_key('spectrum'), max_level, max_points, method)
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+        masses = self.mass_spectrum_array(max_level)
+        levels = downsample(masses, max_points, method)
+        levels.flags.writeable = False
+        points = {'levels': levels, 'mass_spectrum': masses[levels]}
+        points['mass_spectrum'].flags.writeable = False
+        _cache.put(key, points)
+        return points
+
+    def calculate_mass_spectrum(self, max_level: Optional[int] = None) -> List[float]:
+        """Calculate mass spectrum with topology effects for levels 0..max_level"""
+        try:
+            return self.mass_spectrum_array(max_level).tolist()
         except Exception as e:
             logger.error(f"Error calculating mass spectrum: {str(e)}")
             return []
 
-    def update_parameters(self, params: Dict) -> None:
-        """Update system parameters while maintaining consistency"""
+    def _mass_scale(self) -> float:
+        """Mass of level 1; level n sits at sqrt(n) times this"""
+        topology_factor = self.TOPOLOGY_FACTORS[self.compactification['topology']]
+        return float(mass_levels(1.0, self.dimensions, self.tension,
+                                 self.alpha_prime, topology_factor))
+
+    def hagedorn_temperature(self, theory: TheoryType = "superstring") -> float:
+        """Temperature above which the single-string partition function diverges"""
+        return hagedorn_temperature(get_series(theory, self.dimensions - 2), self._mass_scale())
+
+    @timed("thermodynamics")
+    def calculate_thermodynamics(self, temperatures: Sequence[float],
+                                 theory: TheoryType = "superstring",
+                                 max_level: int = THERMO_LEVELS) -> Dict[str, np.ndarray]:
+        """Single-string partition function, free energy, energy and entropy per temperature.
+
+        Temperatures are in the units of the mass spectrum. Levels up to
+        max_level are summed explicitly, higher ones through the asymptotic
+        degeneracy. Above the Hagedorn temperature log Z is inf and the
+        rest nan.
+        """
+        temperatures = np.asarray(temperatures, dtype=float).ravel()
+        if not np.all(np.isfinite(temperatures) & (temperatures > 0)):
+            raise ValueError("Temperatures must be positive and finite")
+        if not 1 <= max_level <= MAX_EXACT_LEVEL:
+            raise ValueError(f"Thermodynamic sums use between 1 and {MAX_EXACT_LEVEL} levels")
+        return thermodynamics(get_series(theory, self.dimensions - 2), self._mass_scale(),
+                              temperatures, max_level)
+
+    def calculate_density_of_states(self, max_level: int = THERMO_LEVELS,
+                                    theory: TheoryType = "superstring") -> Dict[str, np.ndarray]:
+        """Natural log of the number of states per unit mass at levels 1..max_level"""
+        return log_density_of_states(get_series(theory, self.dimensions - 2),
+                                     self._mass_scale(), max_level)
+
+    def calculate_degeneracy(self, max_level: Optional[int] = None,
+                             theory: TheoryType = "superstring",
+                             log: bool = False) -> List[Union[int, float]]:
+        """Number of states at each mass level 0..max_level in the current dimensions.
+
+        Exact counts stop at MAX_EXACT_LEVEL; log=True returns natural-log
+        counts for every level, asymptotic beyond that limit.
+        """
+        if max_level is None:
+            max_level = N_STATES - 1
+        if log and _table is not None:
+            log_counts = _table.log_degeneracy(theory, self.dimensions, max_level)
+            if log_counts is not None:
+                return log_counts.tolist()
+        series = get_series(theory, self.dimensions - 2)
+        if log:
+            return series.log_coefficients(max_level).tolist()
+        return series.coefficients(min(max_level, MAX_EXACT_LEVEL))
+
+    def degeneracy_work(self, max_level: Optional[int] = None,
+                        theory: TheoryType = "superstring", log: bool = False) -> int:
+        """Levels calculate_degeneracy would have to count that are not cached yet"""
+        if max_level is None:
+            max_level = N_STATES - 1
+        if log and _table is not None and max_level < _table.n_levels:
+            return 0
+        series = get_series(theory, self.dimensions - 2)
+        return max(min(max_level, MAX_EXACT_LEVEL) - series.computed, 0)
+
+    def calculate_tower_spectrum(self, cutoff: float,
+                                 limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Closed-string levels with Kaluza-Klein momentum and winding on the compact radii.
+
+        Returns the distinct masses up to cutoff (same units as the mass
+        spectrum) with the number of momentum/winding/oscillator
+        configurations at each, lowest first, keeping at most limit levels.
+        """
+        if cutoff <= 0:
+            raise ValueError("Cutoff must be positive")
+        key = ('tower', self._cache_key('tower'), cutoff, limit)
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Same overall scale as the oscillator spectrum: M = scale * sqrt(M^2 alpha')
+        scale = self._mass_scale() * np.sqrt(self.alpha_prime)
+        mass_sq, multiplicity = enumerate_tower(
+            self.compactification['radius'], self.alpha_prime, (cutoff / scale) ** 2,
+            self.compactification['metric'])
+        result = {
+            'mass': scale * np.sqrt(mass_sq[:limit]),
+            'multiplicity': multiplicity[:limit],
+        }
+        _cache.put(key, result)
+        return result
+
+    def iter_mass_spectrum(self, max_level: int,
+                           block_size: int = SPECTRUM_BLOCK_SIZE) -> Iterator[np.ndarray]:
+        """Generate the spectrum for levels 0..max_level in fixed-size blocks.
+
+        Parameters are captured when this is called, so a stream stays
+        consistent even if the system is updated while it is being consumed.
+        Peak memory is one block regardless of max_level.
+        """
+        if max_level < 0:
+            raise ValueError("max_level must be non-negative")
+        if block_size <= 0:
+            raise ValueError("block_size must be positive")
+        params = (self.dimensions, self.tension, self.alpha_prime,
+                  self.TOPOLOGY_FACTORS[self.compactification['topology']])
+
+        def blocks() -> Iterator[np.ndarray]:
+            for start in range(0, max_level + 1, block_size):
+                n = np.arange(start, min(start + block_size, max_level + 1))
+                yield mass_levels(n, *params)
+
+        return blocks()
+
+    def sweep_mass_spectrum(self,
+                            dimensions: Optional[Sequence[int]] = None,
+                            tension: Optional[Sequence[float]] = None,
+                            alpha_prime: Optional[Sequence[float]] = None,
+                            topology: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Calculate the mass spectrum over the cartesian grid of parameters.
+
+        Axes left as None are pinned to the current system value. The system
+        itself is never modified. Returns columnar arrays: one entry per grid
+        point for each parameter, plus an (N_points x n_states) spectrum.
+        """
+        dims = np.asarray(
+            [self.dimensions] if dimensions is None else dimensions, dtype=int)
+        tensions = np.asarray(
+            [self.tension] if tension is None else tension, dtype=float)
+        alphas = np.asarray(
+            [self.alpha_prime] if alpha_prime is None else alpha_prime, dtype=float)
+        topologies = np.asarray(
+            [self.compactification['topology']] if topology is None else topology,
+            dtype=object)
+
+        for name, axis in (("dimensions", dims), ("tension", tensions),
+                           ("alpha_prime", alphas), ("topology", topologies)):
+            if axis.ndim != 1 or axis.size == 0:
+                raise ValueError(f"Sweep axis '{name}' must be a non-empty list")
+        if np.any((dims < 4) | (dims > 26)):
+            raise ValueError("Dimensions must be between 4 and 26")
+        if np.any(tensions <= 0):
+            raise ValueError("Tension must be positive")
+        if np.any(alphas <= 0):
+            raise ValueError("Alpha prime must be positive")
+        unknown = set(topologies) - set(self.TOPOLOGY_FACTORS)
+        if unknown:
+            raise ValueError(f"Unsupported topology: {sorted(unknown)[0]}")
+
+        # Index grid over all axes, flattened to one row per parameter point
+        grid = [g.ravel() for g in np.meshgrid(
+            np.arange(dims.size), np.arange(tensions.size),
+            np.arange(alphas.size), np.arange(topologies.size), indexing='ij')]
+        topology_factors = np.array(
+            [self.TOPOLOGY_FACTORS[t] for t in topologies], dtype=float)
+
+        d, t, a, topo = dims[grid[0]], tensions[grid[1]], alphas[grid[2]], grid[3]
+        masses = mass_levels(np.arange(N_STATES), d[:, None], t[:, None],
+                             a[:, None], topology_factors[topo][:, None])
+
+        return {
+            'dimensions': d,
+            'tension': t,
+            'alpha_prime': a,
+            'topology': topologies[topo],
+            'mass_spectrum': masses,
+        }
+
+    def _resolve_changes(self, params: Dict) -> Dict:
+        """Validate params against the current state and return only what differs.
+
+        Nothing is modified here, so a rejected update leaves no trace.
+        """
+        changes = {}
+        for name in SCALAR_PARAMETERS:
+            if name in params:
+                value = float(params[name])
+                if not value > 0:
+                    raise ValueError(f"{name.replace('_', ' ').capitalize()} must be positive")
+                if value != getattr(self, name):
+                    changes[name] = value
+
+        dims = int(params.get("dimensions", self.dimensions))
+        if not 4 <= dims <= 26:
+            raise ValueError("Dimensions must be between 4 and 26")
+        topology = params.get("topology", self.compactification['topology'])
+        if topology not in self.TOPOLOGY_FACTORS:
+            raise ValueError(f"Unsupported topology: {topology}")
+
+        # Radii follow the dimension count; they are only reset when it changes
+        radius = self.compactification['radius']
+        if dims != self.dimensions:
+            radius = [1.0] * (dims - 4)
+        if "compactification_radius" in params:
+            value = float(params["compactification_radius"])
+            if not value > 0:
+                raise ValueError("Compactification radius must be positive")
+            radius = [value] * (dims - 4)
+        if "radius" in params:  # One radius per extra dimension, as in to_parameters()
+            radius = [float(r) for r in params["radius"]]
+            if len(radius) != dims - 4:
+                raise ValueError("Expected one radius per extra dimension")
+            if not all(r > 0 for r in radius):
+                raise ValueError("Compactification radius must be positive")
+
+        metrics = self.metrics
+        if "metrics" in params:  # The whole per-topology registry, as in to_parameters()
+            restored = {topology: metric if isinstance(metric, CompactMetric)
+                        else CompactMetric.from_dict(metric)
+                        for topology, metric in params["metrics"].items()}
+            unknown = set(restored) - set(self.TOPOLOGY_FACTORS)
+            if unknown:
+                raise ValueError(f"Unsupported topology: {sorted(unknown)[0]}")
+            if restored != metrics:
+                metrics = restored
+        if "metric" in params:
+            metric = CompactMetric.from_values(params["metric"])
+            if metric.size != dims - 4:
+                raise ValueError(f"Metric must be {dims - 4}x{dims - 4} for {dims} dimensions")
+            if metric != metrics.get(topology):
+                metrics = {**metrics, topology: metric}
+        metric = self.compactification['metric']
+        if (dims, topology) != (self.dimensions, self.compactification['topology']) \
+                or metrics is not self.metrics:
+            candidate = self._generate_metric(dims - 4, topology, metrics)
+            if candidate is not metric and candidate != metric:
+                metric = candidate
+
+        if dims != self.dimensions:
+            changes['dimensions'] = dims
+        if topology != self.compactification['topology']:
+            changes['topology'] = topology
+        if radius != self.compactification['radius']:
+            changes['radius'] = radius
+        if metric is not self.compactification['metric']:
+            changes['metric'] = metric
+        if metrics is not self.metrics:
+            changes['metrics'] = metrics
+        return changes
+
+    @timed("update_parameters")
+    def update_parameters(self, params: Union[Dict, Sequence[Dict]]) -> bool:
+        """Apply params, touching only the inputs whose values actually change.
+
+        Returns whether anything changed. A no-op update does no work and
+        keeps the version, so cached results and ETags stay valid; a rejected
+        one leaves the system as it was. A sequence of params is applied in
+        order, as one update: the version goes up by one at most. If one of
+        them is rejected, the earlier ones stay applied; update a copy.
+        """
+        if not isinstance(params, dict):
+            version, changed = self.version, False
+            for write in params:
+                changed = self.update_parameters(write) or changed
+            self.version = version + changed
+            return changed
         try:
-            if "topology" in params:
-                self.update_topology(params["topology"])
-            
-            if "dimensions" in params:
-                self.dimensions = int(params["dimensions"])
-                self._validate()
-
-            for key, value in params.items():
-                if hasattr(self, key) and key not in ["compactification", "topology"]:
-                    if key == "dimensions":
-                        continue  # Already handled
-                    setattr(self, key, float(value))
-                elif key == "compactification_radius":
-                    radius = float(value)
-                    self.compactification["radius"] = [radius] * (self.dimensions - 4)
-            
-            logger.info(f"Parameters updated: {params}")
+            changes = self._resolve_changes(params)
         except Exception as e:
             logger.error(f"Error updating parameters: {str(e)}")
             raise ValueError(f"Invalid parameters: {str(e)}")
+        if not changes:
+            return False
+
+        for name in SCALAR_PARAMETERS + ('dimensions',):
+            if name in changes:
+                setattr(self, name, changes[name])
+        self.metrics = changes.get('metrics', self.metrics)
+        self.compactification = {
+            'radius': list(changes.get('radius', self.compactification['radius'])),
+            'topology': changes.get('topology', self.compactification['topology']),
+            'metric': changes.get('metric', self.compactification['metric']),
+        }
+        self.version += 1
+        self._invalidate(set(changes))
+        logger.info(f"Parameters updated: {params}")
+        return True
+
+    def to_parameters(self) -> Dict:
+        """Minimal parameters the full state can be rebuilt from"""
+        return {
+            'dimensions': self.dimensions,
+            'tension': self.tension,
+            'coupling': self.coupling,
+            'alpha_prime': self.alpha_prime,
+            'topology': self.compactification['topology'],
+            'radius': list(self.compactification['radius']),
+            'metrics': {topology: metric.to_dict() for topology, metric in self.metrics.items()},
+            'version': self.version,
+        }
+
+    @classmethod
+    def from_parameters(cls, params: Dict) -> "StringTheorySystem":
+        """Rebuild a system from to_parameters() output"""
+        system = cls(dimensions=int(params['dimensions']),
+                     tension=float(params['tension']),
+                     coupling=float(params['coupling']),
+                     alpha_prime=float(params['alpha_prime']))
+        system.metrics = {topology: CompactMetric.from_dict(metric)
+                          for topology, metric in params.get('metrics', {}).items()}
+        system.update_topology(params['topology'])
+        radius = [float(r) for r in params['radius']]
+        if len(radius) != system.dimensions - 4:
+            raise ValueError("Expected one radius per extra dimension")
+        system.compactification['radius'] = radius
+        system.version = int(params['version'])
+        system._invalidate()
+        return system
+
+    def copy(self) -> "StringTheorySystem":
+        """Independent copy that can be updated without affecting this system"""
+        clone = copy.copy(self)
+        clone.compactification = dict(self.compactification,
+                                      radius=list(self.compactification['radius']))
+        return clone
 
     def to_dict(self) -> Dict:
-        return asdict(self)
\ No newline at end of file
+        """Serialized state; a shallow copy of the cached entry, nested values are shared"""
+        key = ('state', self._cache_key('state'))
+        state = _cache.get(key)
+        if state is None:
+            state = {field.name: getattr(self, field.name) for field in fields(self)}
+            state['compactification'] = {
+                'radius': list(self.compactification['radius']),
+                'topology': self.compactification['topology'],
+                'metric': self.compactification['metric'].to_dict(),
+            }
+            _cache.put(key, state)
+        return dict(state)
\ No newline at end of file
@@ -0,0 +1,101 @@
+# File: app/models/thermodynamics.py
+from typing import Dict
+import numpy as np
+
+from app.models.degeneracy import DegeneracySeries
+
+TAIL_NODES = 512  # Quadrature points for the levels beyond the explicit sum
+TEMPERATURE_BLOCK = 1024  # Temperatures reduced at once, bounding the work array
+_TAIL_DECAY = 40.0  # Integrate the tail until its integrand fell by e^-40
+
+
+def hagedorn_temperature(series: DegeneracySeries, mass_scale: float) -> float:
+    """Temperature at which log d(n) ~ A sqrt(n) outgrows the Boltzmann factor"""
+    return mass_scale / series.growth
+
+
+def _tail_nodes(series: DegeneracySeries, max_level: int, log_anchor: float):
+    """Quadrature for sum_{n > max_level} d(n) exp(-beta m sqrt(n)).
+
+    With n = x^2 and x = e^u the sum becomes the integral over u of
+    exp(C + log 2 + (2 - 2p) u + (A - beta m) e^u), where
+    log d(n) ~ C + A sqrt(n) - p log n is the asymptotic degeneracy anchored
+    at max_level. Returns the nodes x and the beta-independent part of the
+    log integrand, trapezoid weights included.
+    """
+    power = (series.transverse + 3) / 4
+    anchor = max(max_level, 1)
+    offset = log_anchor - (series.growth * np.sqrt(anchor) - power * np.log(anchor))
+    # At the Hagedorn temperature the integrand only decays as e^{(2 - 2p) u}
+    span = _TAIL_DECAY / max(2 * power - 2, 0.5)
+    u, du = np.linspace(0, span, TAIL_NODES, retstep=True)
+    u += 0.5 * np.log(max_level + 0.5)
+    weights = np.full(TAIL_NODES, du)
+    weights[[0, -1]] /= 2
+    log_terms = offset + np.log(2) + (2 - 2 * power) * u + np.log(weights)
+    return np.exp(u), log_terms
+
+
+def thermodynamics(series: DegeneracySeries, mass_scale: float, temperatures: np.ndarray,
+                   max_level: int) -> Dict[str, np.ndarray]:
+    """Single-string canonical ensemble over a grid of temperatures.
+
+    Levels 0..max_level are summed explicitly from their log degeneracies;
+    the rest of the spectrum is integrated from the asymptotic degeneracy.
+    Everything is one (temperatures x terms) log-sum-exp per block of
+    temperatures. Above the Hagedorn temperature the sum diverges: log Z
+    is inf and the other quantities are nan. At it, log Z is finite, but
+    in D <= 5 the energy and entropy are inf.
+    """
+    temperatures = np.asarray(temperatures, dtype=float)
+    levels = np.arange(max_level + 1)
+    log_degeneracy = series.log_coefficients(max_level)
+    tail_x, tail_log = _tail_nodes(series, max_level, log_degeneracy[-1])
+
+    # All terms d * exp(-beta M), as log weights and the masses they carry
+    x = np.concatenate([np.sqrt(levels), tail_x])
+    mass = mass_scale * x
+    hagedorn = hagedorn_temperature(series, mass_scale)
+
+    log_z = np.empty(temperatures.size)
+    energy = np.empty(temperatures.size)
+    for start in range(0, temperatures.size, TEMPERATURE_BLOCK):
+        t = temperatures[start:start + TEMPERATURE_BLOCK, None]
+        exponent = np.empty((t.shape[0], x.size))
+        exponent[:, :levels.size] = log_degeneracy - mass[:levels.size] / t
+        # Tail growth A x and Boltzmann factor beta m x nearly cancel close to
+        # T_H, at x up to e^80: take their difference A - beta m = A (T - T_H) / T
+        # first, so it is exactly 0 at T_H and accurate just below it
+        exponent[:, levels.size:] = tail_log + series.growth * (t - hagedorn) / t * tail_x
+        peak = exponent.max(axis=1, keepdims=True)
+        boltzmann = np.exp(exponent - peak)
+        total = boltzmann.sum(axis=1)
+        log_z[start:start + TEMPERATURE_BLOCK] = peak[:, 0] + np.log(total)
+        energy[start:start + TEMPERATURE_BLOCK] = boltzmann @ mass / total
+
+    # At T_H the energy sum runs over n^{1/2 - p} and diverges for p <= 3/2 (D <= 5)
+    if (series.transverse + 3) / 4 <= 1.5:
+        energy[temperatures == hagedorn] = np.inf
+    diverging = temperatures > hagedorn
+    log_z[diverging] = np.inf
+    energy[diverging] = np.nan
+    free_energy = -temperatures * log_z
+    free_energy[diverging] = np.nan
+    return {
+        'temperature': temperatures,
+        'log_partition_function': log_z,
+        'free_energy': free_energy,
+        'energy': energy,
+        'entropy': (energy - free_energy) / temperatures,
+    }
+
+
+def log_density_of_states(series: DegeneracySeries, mass_scale: float,
+                          max_level: int) -> Dict[str, np.ndarray]:
+    """log rho(M) = log d(n) + log dn/dM for levels 1..max_level, with M = m sqrt(n)"""
+    levels = np.arange(1, max_level + 1)
+    return {
+        'mass': mass_scale * np.sqrt(levels),
+        'log_density': (series.log_coefficients(max_level)[1:]
+                        + np.log(2 * np.sqrt(levels) / mass_scale)),
+    }
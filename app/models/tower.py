@@ -0,0 +1,200 @@
+# File: app/models/tower.py
+from typing import Optional, Sequence, Tuple
+import numpy as np
+
+from app.models.metric import CompactMetric
+
+MAX_TOWER_BINS = 2_000_000  # Guard against cutoffs that make the lattice explode
+MAX_TOWER_WORK = 10_000_000  # Entries formed over a whole enumeration, a few seconds at most
+_INT64_SAFE = 2 ** 62
+_PAIR_BLOCK = 1 << 20  # Momentum/winding pairs formed per block for general metrics
+
+
+def _group(energy: np.ndarray, *labels: np.ndarray, counts: np.ndarray,
+           resolution: float) -> Tuple[np.ndarray, ...]:
+    """Merge entries whose energy (to resolution) and integer labels coincide"""
+    key = np.rint(energy / resolution).astype(np.int64)
+    order = np.lexsort((*labels, key))
+    key, counts = key[order], counts[order]
+    labels = [label[order] for label in labels]
+    new = np.ones(key.size, dtype=bool)
+    new[1:] = key[1:] != key[:-1]
+    for label in labels:
+        new[1:] |= label[1:] != label[:-1]
+    starts = np.flatnonzero(new)
+    return (energy[order][starts], *(label[starts] for label in labels),
+            np.add.reduceat(counts, starts))
+
+
+def _widen(counts: np.ndarray, fan_out: int) -> np.ndarray:
+    """Switch to exact Python integers once merged counts could overflow int64"""
+    if counts.dtype != object and counts.sum() > _INT64_SAFE // fan_out:
+        return counts.astype(object)
+    return counts
+
+
+class _Budget:
+    """Entries an enumeration may still form, charged before each allocation.
+
+    The number of bins alone does not bound the work: every step pairs the
+    bins with a whole set of modes, so the total is limited as well.
+    """
+
+    def __init__(self, entries: int = MAX_TOWER_WORK):
+        self.entries = entries
+
+    def spend(self, entries: int) -> None:
+        self.entries -= entries
+        if self.entries < 0:
+            raise ValueError("Cutoff too large for tower enumeration")
+
+
+def _expand(n: np.ndarray, budget: _Budget) -> Tuple[np.ndarray, np.ndarray]:
+    """(source, offset) pairs enumerating range(n[i]) for every i, vectorized"""
+    total = int(n.sum())
+    budget.spend(total)
+    source = np.repeat(np.arange(n.size), n)
+    offsets = np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+    return source, offsets
+
+
+def _circle_modes(radius: float, alpha_prime: float, cutoff_sq: float,
+                  budget: _Budget) -> Tuple[np.ndarray, np.ndarray]:
+    """(mass^2, k*w) of momentum k and winding w on one circle, under the cutoff, by mass^2"""
+    cutoff = np.sqrt(cutoff_sq)
+    k_max = int(np.floor(cutoff * radius))
+    w_max = int(np.floor(cutoff * alpha_prime / radius))
+    budget.spend((2 * k_max + 1) * (2 * w_max + 1))
+    k, w = np.meshgrid(np.arange(-k_max, k_max + 1), np.arange(-w_max, w_max + 1))
+    k, w = k.ravel(), w.ravel()
+    energy = (k / radius) ** 2 + (w * radius / alpha_prime) ** 2
+    keep = np.flatnonzero(energy <= cutoff_sq)
+    keep = keep[np.argsort(energy[keep], kind='stable')]
+    return energy[keep], (k * w)[keep]
+
+
+def _circle_product(radii: Sequence[float], alpha_prime: float, cutoff_sq: float,
+                    resolution: float, budget: _Budget) -> Tuple[np.ndarray, ...]:
+    """Momentum/winding bins for independent circles, built one circle at a time.
+
+    Every term is non-negative, so each bin is only paired with the modes
+    that keep it under the cutoff (the modes are sorted by mass^2), and
+    configurations agreeing in (M^2, k.w) are merged into a single counted bin.
+    """
+    energy = np.zeros(1)
+    winding = np.zeros(1, dtype=np.int64)   # sum_i k_i w_i
+    counts = np.ones(1, dtype=np.int64)
+    for radius in radii:
+        mode_energy, mode_winding = _circle_modes(radius, alpha_prime, cutoff_sq, budget)
+        n = np.searchsorted(mode_energy, cutoff_sq + resolution - energy, 'right')
+        source, offsets = _expand(n, budget)
+        counts = _widen(counts, mode_energy.size)
+        energy, winding, counts = _group(energy[source] + mode_energy[offsets],
+                                         winding[source] + mode_winding[offsets],
+                                         counts=counts[source], resolution=resolution)
+        if energy.size > MAX_TOWER_BINS:
+            raise ValueError("Cutoff too large for tower enumeration")
+    return energy, winding, counts
+
+
+def short_vectors(factor: np.ndarray, bound: float,
+                  budget: Optional[_Budget] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer vectors x with |R x|^2 <= bound, and their squared norms.
+
+    R is upper triangular. Fincke-Pohst enumeration: coordinates are fixed
+    from the last to the first, and each one ranges only over the interval
+    the remaining norm budget allows around its projected centre. All
+    candidates at a level are extended at once.
+    """
+    budget = budget or _Budget()
+    dims = factor.shape[0]
+    diagonal = np.diag(factor)
+    shifts = factor / diagonal[:, None]  # r_ij / r_ii
+    slack = max(bound, 1.0) * 1e-12
+    points = np.zeros((1, 0), dtype=np.int64)  # Coordinates i..d-1 fixed so far
+    norms = np.zeros(1)
+    for i in range(dims - 1, -1, -1):
+        centre = -(points @ shifts[i, i + 1:])
+        width = np.sqrt(np.maximum(bound + slack - norms, 0)) / diagonal[i]
+        low = np.ceil(centre - width).astype(np.int64)
+        high = np.floor(centre + width).astype(np.int64)
+        source, offsets = _expand(np.maximum(high - low + 1, 0), budget)
+        x = low[source] + offsets
+        norms = norms[source] + (diagonal[i] * (x - centre[source])) ** 2
+        points = np.column_stack([x, points[source]])
+        keep = norms <= bound + slack
+        points, norms = points[keep], norms[keep]
+    return points, norms
+
+
+def _lattice_product(radii: Sequence[float], alpha_prime: float, cutoff_sq: float,
+                     metric: CompactMetric, resolution: float,
+                     budget: _Budget) -> Tuple[np.ndarray, ...]:
+    """Momentum/winding bins for a general metric G on the torus.
+
+    Momentum costs k^T R^-1 G^-1 R^-1 k and winding w^T R G R w / alpha'^2,
+    with R = diag(radii). Both quadratic forms reuse the metric's cached
+    Cholesky factors, rescaled by the radii.
+    """
+    radii = np.asarray(radii, dtype=float)
+    momentum_factor = (metric.inverse_cholesky() / radii[:, None]).T
+    winding_factor = (metric.cholesky() * (radii / alpha_prime)[:, None]).T
+    momenta, momentum_energy = short_vectors(momentum_factor, cutoff_sq, budget)
+    windings, winding_energy = short_vectors(winding_factor, cutoff_sq, budget)
+
+    order = np.argsort(winding_energy)
+    windings, winding_energy = windings[order], winding_energy[order]
+    n = np.searchsorted(winding_energy, cutoff_sq + resolution - momentum_energy, 'right')
+    source, offsets = _expand(n, budget)
+
+    energy = momentum_energy[source] + winding_energy[offsets]
+    winding = np.empty(source.size, dtype=np.int64)
+    for start in range(0, source.size, _PAIR_BLOCK):
+        block = slice(start, start + _PAIR_BLOCK)
+        winding[block] = np.einsum('ij,ij->i', momenta[source[block]], windings[offsets[block]])
+    return _group(energy, winding, counts=np.ones(energy.size, dtype=np.int64),
+                  resolution=resolution)
+
+
+def enumerate_tower(radii: Sequence[float], alpha_prime: float, cutoff_sq: float,
+                    metric: Optional[CompactMetric] = None,
+                    max_work: int = MAX_TOWER_WORK) -> Tuple[np.ndarray, np.ndarray]:
+    """Closed-string levels with momentum, winding and oscillator excitations.
+
+    M^2 = k^T R^-1 G^-1 R^-1 k + w^T R G R w / alpha'^2 + (2/alpha')(N_L + N_R),
+    with level matching N_L - N_R = k.w and R = diag(radii). Returns the
+    distinct M^2 values up to cutoff_sq, ascending, and how many
+    (k, w, N_L, N_R) configurations share each one. G defaults to the identity.
+
+    A diagonal G just rescales each radius by sqrt(G_ii), so the circles stay
+    independent and are combined one at a time; the work scales with the
+    number of distinct bins, not lattice points. A general G is handled by
+    Fincke-Pohst enumeration of the momentum and winding lattices.
+
+    Raises ValueError when the cutoff needs more than max_work entries in
+    total, before allocating them.
+    """
+    budget = _Budget(max_work)
+    resolution = max(cutoff_sq, 1.0) * 1e-12
+    if metric is not None and metric.kind == "dense":
+        energy, winding, counts = _lattice_product(radii, alpha_prime, cutoff_sq,
+                                                   metric, resolution, budget)
+    else:
+        radii = np.asarray(radii, dtype=float)
+        if metric is not None:
+            radii = radii * np.sqrt(metric.diagonal())
+        energy, winding, counts = _circle_product(radii, alpha_prime, cutoff_sq,
+                                                  resolution, budget)
+
+    # Oscillators: N_R >= max(0, -k.w), N_L = N_R + k.w
+    n_right_min = np.maximum(0, -winding)
+    step = 4 / alpha_prime  # Raising N_R (and with it N_L) by one
+    base = energy + (2 / alpha_prime) * (2 * n_right_min + winding)
+    n_levels = np.floor((cutoff_sq + resolution - base) / step).astype(np.int64) + 1
+    n_levels = np.maximum(n_levels, 0)
+    source, offsets = _expand(n_levels, budget)
+    counts = _widen(counts, max(int(n_levels.max()), 1))
+    mass_sq = base[source] + step * offsets
+
+    mass_sq, counts = _group(mass_sq, counts=counts[source], resolution=resolution)
+    return mass_sq, counts
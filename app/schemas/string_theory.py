@@ -1,6 +1,6 @@
 # File: app/schemas/string_theory.py
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Literal
+from typing import Dict, List, Optional, Literal, Union
 
 TopologyType = Literal["Calabi-Yau", "Torus", "Orbifold", "K3"]
 
@@ -11,16 +11,125 @@ class StringParameters(BaseModel):
     alpha_prime: Optional[float] = Field(None, gt=0)
     compactification_radius: Optional[float] = Field(None, gt=0)
     topology: Optional[TopologyType] = None
+    # Compact-space metric for the topology: its diagonal, or the full symmetric matrix
+    metric: Optional[Union[List[float], List[List[float]]]] = None
 
 class SystemState(BaseModel):
-    dimensions: int
-    tension: float
-    coupling: float
-    alpha_prime: float
-    compactification: Dict
-    mass_spectrum: List[float]
-    timestamp: str
+    # Every field may be left out through the `fields`/`exclude` query options
+    dimensions: Optional[int] = None
+    tension: Optional[float] = None
+    coupling: Optional[float] = None
+    alpha_prime: Optional[float] = None
+    compactification: Optional[Dict] = None
+    mass_spectrum: Optional[List[float]] = None
+    levels: Optional[List[int]] = None  # Levels kept when the spectrum is downsampled
+    degeneracy: Optional[List[Optional[Union[int, float]]]] = None
+    timestamp: Optional[str] = None
+    version: Optional[int] = None
 
 class SystemResponse(BaseModel):
     status: str
-    data: SystemState
\ No newline at end of file
+    data: SystemState
+
+class ParameterRange(BaseModel):
+    """Evenly spaced, inclusive range of parameter values.
+
+    Give either ``num`` (number of points) or ``step`` (spacing).
+    """
+    start: float
+    stop: float
+    num: Optional[int] = Field(None, ge=1)
+    step: Optional[float] = Field(None, gt=0)
+
+class SweepRequest(BaseModel):
+    dimensions: Optional[Union[List[int], ParameterRange]] = None
+    tension: Optional[Union[List[float], ParameterRange]] = None
+    alpha_prime: Optional[Union[List[float], ParameterRange]] = None
+    topology: Optional[List[TopologyType]] = None
+
+class SweepResult(BaseModel):
+    n_points: int
+    n_states: int
+    dimensions: List[int]
+    tension: List[float]
+    alpha_prime: List[float]
+    topology: List[str]
+    mass_spectrum: List[List[float]]
+
+class SweepResponse(BaseModel):
+    status: str
+    data: SweepResult
+
+class HistoryResult(BaseModel):
+    n_points: int
+    n_states: int
+    version: List[int]
+    timestamp: List[float]
+    dimensions: List[int]
+    topology: List[str]
+    tension: List[float]
+    coupling: List[float]
+    alpha_prime: List[float]
+    mass_spectrum: List[List[float]]
+
+class HistoryResponse(BaseModel):
+    status: str
+    data: HistoryResult
+
+class ThermodynamicsRequest(BaseModel):
+    temperature: Union[List[float], ParameterRange]
+    relative: bool = False  # Temperatures given in units of the Hagedorn temperature
+    theory: Literal["bosonic", "superstring"] = "superstring"
+    max_level: int = Field(1000, ge=1, le=5000)
+    density: bool = False  # Also return the density of states up to max_level
+
+class DensityOfStates(BaseModel):
+    mass: List[float]
+    log_density: List[float]
+
+class ThermodynamicsResult(BaseModel):
+    # Null where the partition function diverges, above the Hagedorn temperature
+    # (energy and entropy also at it, in D <= 5)
+    hagedorn_temperature: float
+    temperature: List[float]
+    log_partition_function: List[Optional[float]]
+    free_energy: List[Optional[float]]
+    energy: List[Optional[float]]
+    entropy: List[Optional[float]]
+    density_of_states: Optional[DensityOfStates] = None
+
+class ThermodynamicsResponse(BaseModel):
+    status: str
+    data: ThermodynamicsResult
+
+class TowerSpectrum(BaseModel):
+    cutoff: float
+    n_levels: int
+    mass: List[float]
+    multiplicity: List[int]
+
+class TowerResponse(BaseModel):
+    status: str
+    data: TowerSpectrum
+
+class JobRequest(BaseModel):
+    """Background computation: a spectrum up to max_level, or a parameter sweep"""
+    kind: Literal["spectrum", "sweep"]
+    max_level: Optional[int] = Field(None, ge=0)
+    sweep: Optional[SweepRequest] = None
+
+class JobInfo(BaseModel):
+    job_id: str
+    kind: str
+    params: Dict
+    status: str
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    queued_ms: Optional[float] = None
+    run_ms: Optional[float] = None
+    error: Optional[str] = None
+
+class JobResponse(BaseModel):
+    status: str
+    data: JobInfo
\ No newline at end of file
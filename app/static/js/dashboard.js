@@ -125,18 +125,62 @@ function createParameterControls() {
         const controlElement = createControlElement(key, info);
         container.appendChild(controlElement);
     }
+    container.appendChild(createLevelControl());
 
     const massSpectrumDiv = document.getElementById('massSpectrum');
     massSpectrumDiv.parentElement.insertBefore(container, massSpectrumDiv);
 }
 
-function updateMassSpectrum(spectrum) {
+// Highest mass level to plot; the server downsamples anything we cannot draw
+const DEFAULT_MAX_LEVEL = 9;
+let maxLevel = DEFAULT_MAX_LEVEL;
+
+function plotWidth() {
+    const plot = document.getElementById('massSpectrum');
+    return Math.round((plot && plot.clientWidth) || window.innerWidth * 0.9);
+}
+
+// Query string asking for no more spectrum points than the plot has pixels
+function viewQuery() {
+    const params = new URLSearchParams({max_points: Math.max(plotWidth(), 4)});
+    if (maxLevel !== DEFAULT_MAX_LEVEL) {
+        params.set('max_level', maxLevel);
+    }
+    return params.toString();
+}
+
+function createLevelControl() {
+    const group = document.createElement('div');
+    group.className = 'mb-6 flex justify-between items-center';
+    group.innerHTML = `
+        <label for="maxLevel" class="font-medium text-gray-700">Mass Levels Shown</label>
+        <input id="maxLevel" type="number" min="1" max="10000000" step="1"
+               class="border rounded px-3 py-2 w-32 text-right">
+    `;
+    const input = group.querySelector('input');
+    input.value = maxLevel + 1;
+    input.addEventListener('change', () => {
+        const levels = parseInt(input.value, 10);
+        if (levels >= 1) {
+            maxLevel = levels - 1;
+            lastEtag = null;  // A different view of the same version
+            updateDisplay();
+        }
+    });
+    return group;
+}
+
+function updateMassSpectrum(spectrum, degeneracy = [], levels = null) {
+    // Level of each point: listed by the server when it downsampled the spectrum
+    const x = levels || Array.from({length: spectrum.length}, (_, i) => i);
+    const showMarkers = spectrum.length <= 100;
+
     // Main spectrum trace
     const mainTrace = {
-        x: Array.from({length: spectrum.length}, (_, i) => i),
+        x: x,
         y: spectrum,
         type: 'scatter',
-        mode: 'lines+markers',
+        mode: showMarkers ? 'lines+markers' : 'lines',
         name: 'Mass Levels',
         line: {
             color: '#4299e1',
@@ -148,15 +192,9 @@ function updateMassSpectrum(spectrum) {
         }
     };
     
-    // Calculate degeneracy (number of states) at each level
-    const degeneracy = spectrum.map((_, i) => {
-        if (i === 0) return 1;  // Ground state
-        return i * Math.pow(2, Math.min(i, 3));  // Simplified degeneracy
-    });
-
-    // Degeneracy trace
+    // Degeneracy trace: exact state counts computed by the server
     const degTrace = {
-        x: Array.from({length: spectrum.length}, (_, i) => i),
+        x: x.slice(0, degeneracy.length),
         y: degeneracy,
         yaxis: 'y2',
         type: 'bar',
@@ -167,9 +205,14 @@ function updateMassSpectrum(spectrum) {
         hovertemplate: '%{y} possible states<extra></extra>'
     };
 
-    // Calculate fixed y-axis ranges based on the current spectrum
-    const maxMass = Math.max(...spectrum) * 1.1; // Add 10% padding
-    const maxDegeneracy = Math.max(...degeneracy) * 1.1;
+    // Calculate fixed y-axis ranges based on the current spectrum; a loop,
+    // since spreading a large array into Math.max overflows the call stack
+    let maxMass = 0;
+    for (const mass of spectrum) {
+        if (mass > maxMass) maxMass = mass;
+    }
+    maxMass = (maxMass || 1) * 1.1; // Add 10% padding
+    const lastLevel = x.length ? x[x.length - 1] : 0;
 
     const layout = {
         title: 'String Mass Spectrum with State Counting',
@@ -178,7 +221,7 @@ function updateMassSpectrum(spectrum) {
         xaxis: {
             title: 'Energy Level (n)',
             gridcolor: 'rgba(0,0,0,0.1)',
-            range: [-0.5, spectrum.length - 0.5] // Fix x-axis range
+            range: [-0.5, lastLevel + 0.5] // Fix x-axis range
         },
         yaxis: {
             title: 'Mass (M)',
@@ -195,7 +238,7 @@ function updateMassSpectrum(spectrum) {
             overlaying: 'y',
             side: 'right',
             showgrid: false,
-            range: [0, maxDegeneracy], // Fix secondary y-axis range
+            type: 'log', // Counts grow exponentially with the level
             fixedrange: true // Prevent zooming/panning
         },
         paper_bgcolor: 'rgba(0,0,0,0)',
@@ -217,16 +260,27 @@ function updateMassSpectrum(spectrum) {
         }
     };
 
-    Plotly.newPlot('massSpectrum', [mainTrace, degTrace], layout, {
+    // react diffs against the current plot instead of rebuilding it
+    Plotly.react('massSpectrum', [mainTrace, degTrace], layout, {
         displayModeBar: false, // Hide the modebar
         responsive: true // Make the plot responsive
     });
 }
 
+// ETag of the last state we rendered; lets the server answer 304 when unchanged
+let lastEtag = null;
+
 function updateDisplay() {
     return new Promise(async (resolve, reject) => {
         try {
-            const response = await fetch('/api/v1/string-theory/');
+            const headers = lastEtag ? {'If-None-Match': lastEtag} : {};
+            const response = await fetch(`/api/v1/string-theory/?${viewQuery()}`,
+                                         {headers, cache: 'no-store'});
+            if (response.status === 304) {
+                resolve();  // Nothing changed, skip the redraw
+                return;
+            }
+            lastEtag = response.headers.get('ETag');
             const data = await response.json();
             
             if (data.status === 'success') {
@@ -249,8 +303,7 @@ function updateDisplay() {
                     }
                 }
 
-                updateMassSpectrum(data.data.mass_spectrum);
-                updateStateDisplay(data.data);
+                renderState(data.data);
             }
             resolve();
         } catch (error) {
@@ -296,7 +349,7 @@ async function updateSystem() {
     });
 
     try {
-        const response = await fetch('/api/v1/string-theory/update', {
+        const response = await fetch(`/api/v1/string-theory/update?${viewQuery()}`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -306,8 +359,8 @@ async function updateSystem() {
         
         const data = await response.json();
         if (data.status === 'success') {
-            updateMassSpectrum(data.data.mass_spectrum);
-            updateStateDisplay(data.data);
+            lastEtag = response.headers.get('ETag');
+            renderState(data.data);
         }
     } catch (error) {
         console.error('Error updating system:', error);
@@ -333,13 +386,17 @@ function addEventListeners() {
     });
 }
 
-function initDashboard() {
-    createParameterControls();
-    updateDisplay();
-    addEventListeners();
-    
+let pollTimer = null;
+
+function renderState(state) {
+    updateMassSpectrum(state.mass_spectrum, state.degeneracy, state.levels);
+    updateStateDisplay(state);
+}
+
+function startPolling() {
+    if (pollTimer !== null) return;
     // Periodic updates that respect manual changes
-    setInterval(async () => {
+    pollTimer = setInterval(async () => {
         const timeSinceLastUpdate = Date.now() - lastUpdateTime;
         if (timeSinceLastUpdate >= UPDATE_INTERVAL) {
             await updateDisplay();
@@ -347,4 +404,35 @@ function initDashboard() {
     }, UPDATE_INTERVAL);
 }
 
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+function subscribeToState() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    // The server pushes a state event on connect and after every update
+    const source = new EventSource('/api/v1/string-theory/events');
+    source.addEventListener('state', event => {
+        if (maxLevel === DEFAULT_MAX_LEVEL) {
+            renderState(JSON.parse(event.data));
+        } else {
+            updateDisplay();  // Events carry the default view; fetch ours instead
+        }
+    });
+    source.onopen = stopPolling;
+    // EventSource reconnects by itself; poll until it does
+    source.onerror = startPolling;
+}
+
+function initDashboard() {
+    createParameterControls();
+    updateDisplay();
+    addEventListeners();
+    subscribeToState();
+}
+
 document.addEventListener('DOMContentLoaded', initDashboard);
\ No newline at end of file
@@ -0,0 +1,260 @@
+# File: benchmarks/load.py
+"""Load generator simulating a fleet of dashboard clients.
+
+    python -m benchmarks.load --clients 200 --duration 60 --output load.json
+    python -m benchmarks.load --url http://localhost:8000 --clients 500
+    python -m benchmarks.load --baseline load.json --threshold 0.25
+
+Each client behaves like dashboard.js: it polls the state every interval
+with its last ETag and a point budget for the plot, and a fraction of the
+clients also send one update with random valid parameters per interval.
+Without --url the requests go through the ASGI app in this process, so
+client and server share one CPU and one event loop; point --url at a
+running uvicorn to measure the server alone. The report is written as
+JSON; with --baseline, the exit status is 1 if any latency percentile grew
+or the throughput fell by more than the threshold.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from app.schemas.string_theory import StringParameters, TopologyType
+
+API_PREFIX = "/api/v1/string-theory"
+UPDATE_INTERVAL = 2.0  # Seconds between polls, as in dashboard.js
+PLOT_POINTS = 1200  # max_points the dashboard asks for on a typical screen
+TOPOLOGIES = TopologyType.__args__
+
+
+def random_parameters(rng: random.Random) -> Dict:
+    """Every field the dashboard sends, drawn at random within the valid ranges"""
+    return StringParameters(
+        dimensions=rng.randint(4, 26),
+        tension=10 ** rng.uniform(-3, 3),
+        coupling=10 ** rng.uniform(-3, 0),
+        alpha_prime=10 ** rng.uniform(-2, 2),
+        topology=rng.choice(TOPOLOGIES),
+    ).model_dump(exclude_unset=True)
+
+
+class EndpointStats:
+    """Latencies, statuses and payload sizes of one endpoint"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.failures = 0  # Transport errors and timeouts: no status at all
+        self.bytes = 0
+
+    def record(self, latency: float, status: Optional[int], size: int = 0) -> None:
+        self.latencies.append(latency)
+        if status is None:
+            self.failures += 1
+        else:
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        self.bytes += size
+
+    def summary(self, duration: float) -> Dict:
+        count = len(self.latencies)
+        errors = self.failures + sum(n for status, n in self.statuses.items()
+                                     if int(status) >= 400)
+        latencies_ms = np.array(self.latencies) * 1000
+        percentiles = (np.percentile(latencies_ms, [50, 95, 99]).tolist()
+                       if count else [None] * 3)
+        return {
+            'requests': count,
+            'throughput_rps': count / duration,
+            'errors': errors,
+            'error_rate': errors / count if count else 0.0,
+            'statuses': dict(sorted(self.statuses.items())),
+            'latency_ms': {
+                'mean': float(latencies_ms.mean()) if count else None,
+                'p50': percentiles[0],
+                'p95': percentiles[1],
+                'p99': percentiles[2],
+                'max': float(latencies_ms.max()) if count else None,
+            },
+            'bytes': self.bytes,
+            'bytes_per_request': self.bytes / count if count else 0.0,
+        }
+
+
+async def _timed(stats: EndpointStats, request) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        stats.record(time.perf_counter() - start, None)
+        return None
+    stats.record(time.perf_counter() - start, response.status_code, len(response.content))
+    return response
+
+
+async def dashboard_client(client: httpx.AsyncClient, stats: Dict[str, EndpointStats],
+                           deadline: float, interval: float, updates: bool,
+                           session: Optional[str], rng: random.Random) -> None:
+    """One dashboard: an optional update, then a conditional poll, every interval"""
+    headers = {'X-Session-ID': session} if session else {}
+    params = {'max_points': PLOT_POINTS}
+    etag = None
+    # Dashboards open at different moments, not all in the same millisecond
+    await asyncio.sleep(rng.uniform(0, interval))
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        if updates:
+            response = await _timed(stats['POST /update'], client.post(
+                f"{API_PREFIX}/update", params=params, headers=headers,
+                json=random_parameters(rng)))
+            if response is not None and response.status_code == 200:
+                etag = response.headers.get('etag')
+        poll_headers = dict(headers, **({'If-None-Match': etag} if etag else {}))
+        response = await _timed(stats['GET /'], client.get(
+            f"{API_PREFIX}/", params=params, headers=poll_headers))
+        if response is not None and response.status_code == 200:
+            etag = response.headers.get('etag')
+        await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+
+async def simulate(clients: int = 50, duration: float = 30.0, interval: float = UPDATE_INTERVAL,
+                   update_fraction: float = 0.1, sessions: int = 0,
+                   url: Optional[str] = None, seed: int = 0, timeout: float = 30.0) -> Dict:
+    """Run the client fleet for duration seconds and summarize what it saw.
+
+    sessions=0 puts every client on the shared default session, as the
+    dashboard does; otherwise clients are spread over that many sessions.
+    """
+    rng = random.Random(seed)
+    stats = {'GET /': EndpointStats(), 'POST /update': EndpointStats()}
+    n_updaters = math.ceil(clients * update_fraction)
+    if url is None:
+        from app.main import app
+        client = httpx.AsyncClient(app=app, base_url="http://load", timeout=timeout)
+    else:
+        limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+        client = httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+
+    start = time.perf_counter()
+    async with client:
+        await asyncio.gather(*[
+            dashboard_client(client, stats, start + duration, interval, i < n_updaters,
+                             f"load-{i % sessions}" if sessions else None,
+                             random.Random(rng.random()))
+            for i in range(clients)
+        ])
+    elapsed = time.perf_counter() - start
+
+    endpoints = {name: endpoint.summary(elapsed) for name, endpoint in stats.items()}
+    requests = sum(endpoint['requests'] for endpoint in endpoints.values())
+    errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'target': url or "in-process",
+            'clients': clients,
+            'updating_clients': n_updaters,
+            'sessions': sessions,
+            'duration_s': duration,
+            'elapsed_s': elapsed,
+            'interval_s': interval,
+            'seed': seed,
+        },
+        'totals': {
+            'requests': requests,
+            'throughput_rps': requests / elapsed,
+            'errors': errors,
+            'error_rate': errors / requests if requests else 0.0,
+            'bytes': sum(endpoint['bytes'] for endpoint in endpoints.values()),
+        },
+        'endpoints': endpoints,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Latency percentiles that grew, or throughputs that fell, by more than threshold"""
+    regressions = []
+    for name, endpoint in current['endpoints'].items():
+        old = baseline.get('endpoints', {}).get(name)
+        if old is None:
+            continue
+        for percentile in ('p50', 'p95', 'p99'):
+            before, after = old['latency_ms'][percentile], endpoint['latency_ms'][percentile]
+            if before and after is not None and after / before > 1 + threshold:
+                regressions.append({'metric': f"{name} {percentile}", 'baseline': before,
+                                    'current': after, 'ratio': after / before})
+        before, after = old['throughput_rps'], endpoint['throughput_rps']
+        if before and after / before < 1 - threshold:
+            regressions.append({'metric': f"{name} throughput_rps", 'baseline': before,
+                                'current': after, 'ratio': after / before})
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50, help="Simulated dashboards")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--interval", type=float, default=UPDATE_INTERVAL,
+                        help="Seconds between a client's polls")
+    parser.add_argument("--update-fraction", type=float, default=0.1,
+                        help="Fraction of clients that also send an update every interval")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="Spread clients over this many sessions (0: shared default)")
+    parser.add_argument("--url", help="Base URL of a running server; in-process if omitted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed relative change before it counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.clients < 1 or args.duration <= 0 or args.interval <= 0:
+        parser.error("clients, duration and interval must be positive")
+    if not 0 <= args.update_fraction <= 1:
+        parser.error("update fraction must be between 0 and 1")
+
+    report = asyncio.run(simulate(args.clients, args.duration, args.interval,
+                                  args.update_fraction, args.sessions, args.url,
+                                  args.seed, args.timeout))
+    for name, endpoint in report['endpoints'].items():
+        latency = endpoint['latency_ms']
+        if endpoint['requests']:
+            print(f"{name:<14} {endpoint['requests']:>8} req {endpoint['throughput_rps']:>9.1f}/s "
+                  f"p50 {latency['p50']:.2f} ms p95 {latency['p95']:.2f} ms "
+                  f"p99 {latency['p99']:.2f} ms errors {endpoint['error_rate']:.2%}",
+                  file=sys.stderr)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        report['baseline'] = {'file': args.baseline, 'threshold': args.threshold,
+                              'regressions': regressions}
+        for regression in regressions:
+            print(f"REGRESSION {regression['metric']}: {regression['baseline']:.2f} -> "
+                  f"{regression['current']:.2f} ({regression['ratio']:.2f}x)", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
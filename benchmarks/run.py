@@ -0,0 +1,239 @@
+# File: benchmarks/run.py
+"""Offline benchmarks for the model, serialization and API hot paths.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json --threshold 0.25
+
+Every case is timed in-process, the API ones through the ASGI app, so no
+server or network is needed. Results are written as JSON. With --baseline
+the run is compared against an earlier result file, and the exit status is
+1 if any case slowed down by more than the threshold.
+"""
+from dataclasses import asdict
+from datetime import datetime
+from itertools import cycle
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pydantic
+from httpx import AsyncClient
+
+from app.main import app
+from app.models import string_theory
+from app.models.string_theory import StringTheorySystem
+from app.core.serialization import dumps, float_buffer
+from app.schemas.string_theory import SystemResponse
+from app.api.v1.endpoints.string_theory import StateQuery, _system_state
+
+API_PREFIX = "/api/v1/string-theory"
+DEFAULT_DIMENSIONS = (4, 10, 18, 26)
+DEFAULT_LEVELS = (10, 1000)
+
+
+def measure(func: Callable[[], object], min_time: float = 0.2,
+            repeat: int = 5) -> Dict[str, float]:
+    """Time func, calibrating the loop count so each repeat runs about min_time / repeat"""
+    loops, target = 1, min_time / repeat
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target or loops >= 1 << 20:
+            break
+        loops = loops * 10 if elapsed < target / 10 else max(loops + 1, int(loops * target / elapsed))
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - start) / loops)
+    median = statistics.median(timings)
+    return {
+        'median_us': median * 1e6,
+        'min_us': min(timings) * 1e6,
+        'ops_per_sec': 1 / median if median > 0 else float('inf'),
+        'loops': loops,
+        'repeat': repeat,
+    }
+
+
+def _system(dimensions: int) -> StringTheorySystem:
+    system = StringTheorySystem()
+    system.update_parameters({"dimensions": dimensions})
+    return system
+
+
+def model_cases(dimensions: int, levels: int) -> Iterator[tuple]:
+    """(name, func) pairs for the model and serialization hot paths"""
+    system = _system(dimensions)
+    query = StateQuery(levels - 1, None, None, "superstring", False, None, "lttb")
+    state = _system_state(system, query)
+    tensions = cycle([1.0, 2.0])
+
+    def cold_spectrum():
+        string_theory._cache.clear()
+        system.calculate_mass_spectrum(levels - 1)
+
+    yield "mass_spectrum", lambda: system.calculate_mass_spectrum(levels - 1)
+    yield "mass_spectrum_uncached", cold_spectrum
+    yield "update_parameters", lambda: system.copy().update_parameters(
+        {"tension": next(tensions)})
+    yield "to_dict", system.to_dict
+    yield "asdict", lambda: asdict(system)
+    yield "system_state", lambda: _system_state(system, query)
+    # The generic path: Python lists revalidated by pydantic, then encoded
+    listed = {**state, 'mass_spectrum': state['mass_spectrum'].tolist()}
+    yield "response_validation", lambda: SystemResponse.model_validate(
+        {"status": "success", "data": listed}).model_dump_json()
+    yield "fast_json", lambda: dumps({"status": "success", "data": state})
+    yield "binary_spectrum", lambda: bytes(float_buffer(state['mass_spectrum']))
+    # One temperature per level, up to just below the Hagedorn temperature
+    temperatures = np.linspace(0.01, 0.99, levels) * system.hagedorn_temperature()
+    yield "thermodynamics", lambda: system.calculate_thermodynamics(temperatures)
+
+
+def api_cases(loop: asyncio.AbstractEventLoop, client: AsyncClient,
+              dimensions: int, levels: int) -> Iterator[tuple]:
+    """(name, func) pairs for full requests through the ASGI app"""
+    headers = {"X-Session-ID": f"bench-{dimensions}"}
+    params = {"max_level": levels - 1}
+    loop.run_until_complete(client.post(f"{API_PREFIX}/update", headers=headers,
+                                        json={"dimensions": dimensions}))
+    tensions = cycle([1.0, 2.0])
+
+    def get_state():
+        response = loop.run_until_complete(client.get(f"{API_PREFIX}/", headers=headers,
+                                                      params=params))
+        response.raise_for_status()
+
+    def post_update():
+        response = loop.run_until_complete(client.post(
+            f"{API_PREFIX}/update", headers=headers, params=params,
+            json={"tension": next(tensions)}))
+        response.raise_for_status()
+
+    yield "api_get_state", get_state
+    yield "api_post_update", post_update
+
+
+def run(dimensions: Sequence[int] = DEFAULT_DIMENSIONS, levels: Sequence[int] = DEFAULT_LEVELS,
+        min_time: float = 0.2, repeat: int = 5, only: Optional[str] = None,
+        include_api: bool = True) -> Dict:
+    """Run every case for each (dimensions, levels) pair and collect the results"""
+    results: List[Dict] = []
+
+    def record(name: str, func: Callable, dims: int, n_levels: int) -> None:
+        case = f"{name}[dimensions={dims},levels={n_levels}]"
+        if only and only not in case:
+            return
+        results.append({'case': case, 'name': name, 'dimensions': dims,
+                        'levels': n_levels, **measure(func, min_time, repeat)})
+        print(f"{case:<60} {results[-1]['median_us']:>12.2f} us", file=sys.stderr)
+
+    for dims in dimensions:
+        for n_levels in levels:
+            for name, func in model_cases(dims, n_levels):
+                record(name, func, dims, n_levels)
+
+    if include_api:
+        loop = asyncio.new_event_loop()
+        client = AsyncClient(app=app, base_url="http://bench")
+        try:
+            for dims in dimensions:
+                for n_levels in levels:
+                    for name, func in api_cases(loop, client, dims, n_levels):
+                        record(name, func, dims, n_levels)
+        finally:
+            loop.run_until_complete(client.aclose())
+            loop.close()
+
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pydantic': pydantic.VERSION,
+            'platform': platform.platform(),
+            'min_time': min_time,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Cases present in both runs whose median slowed down by more than threshold"""
+    previous = {result['case']: result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get(result['case'])
+        if old is None or old['median_us'] <= 0:
+            continue
+        ratio = result['median_us'] / old['median_us']
+        if ratio > 1 + threshold:
+            regressions.append({'case': result['case'], 'baseline_us': old['median_us'],
+                                'current_us': result['median_us'], 'ratio': ratio})
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',') if item]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dimensions", type=_int_list, default=list(DEFAULT_DIMENSIONS),
+                        help="Comma-separated dimensions to run, between 4 and 26")
+    parser.add_argument("--levels", type=_int_list, default=list(DEFAULT_LEVELS),
+                        help="Comma-separated numbers of mass levels per spectrum")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Approximate seconds spent timing each case")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--no-api", action="store_true", help="Skip the ASGI request cases")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown before a case counts as a regression")
+    args = parser.parse_args(argv)
+
+    if any(not 4 <= dims <= 26 for dims in args.dimensions):
+        parser.error("dimensions must be between 4 and 26")
+    if any(n < 1 for n in args.levels):
+        parser.error("levels must be positive")
+
+    report = run(args.dimensions, args.levels, args.min_time, args.repeat,
+                 args.only, not args.no_api)
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        report['baseline'] = {'file': args.baseline, 'threshold': args.threshold,
+                              'regressions': regressions}
+        for regression in regressions:
+            print(f"REGRESSION {regression['case']}: {regression['baseline_us']:.2f} us -> "
+                  f"{regression['current_us']:.2f} us ({regression['ratio']:.2f}x)",
+                  file=sys.stderr)
+        status = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
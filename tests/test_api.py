@@ -2,6 +2,8 @@ import pytest
 from httpx import AsyncClient
 from app.main import app
 import asyncio
+import json
+import numpy as np
 
 pytestmark = pytest.mark.asyncio
 
@@ -151,4 +153,688 @@ async def test_system_resilience():
             
             # System should still be responsive after each edge case
             health_check = await client.get("/api/v1/string-theory/")
-            assert health_check.status_code == 200
\ No newline at end of file
+            assert health_check.status_code == 200
+# Sweep tests
+async def test_sweep_leaves_system_untouched():
+    """Test that a parameter sweep does not modify the live system."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        before = (await client.get("/api/v1/string-theory/")).json()["data"]
+
+        request = {
+            "dimensions": {"start": 4, "stop": 26},
+            "tension": {"start": 0.5, "stop": 5.0, "num": 50},
+            "topology": ["Calabi-Yau", "Torus", "Orbifold", "K3"]
+        }
+        response = await client.post("/api/v1/string-theory/sweep", json=request)
+        assert response.status_code == 200
+        result = response.json()["data"]
+        assert result["n_points"] == 23 * 50 * 4
+        assert len(result["dimensions"]) == result["n_points"]
+        assert len(result["mass_spectrum"]) == result["n_points"]
+        assert all(len(row) == result["n_states"] for row in result["mass_spectrum"])
+
+        after = (await client.get("/api/v1/string-theory/")).json()["data"]
+        for key in ["dimensions", "tension", "alpha_prime", "compactification"]:
+            assert after[key] == before[key]
+
+async def test_sweep_invalid_values():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/string-theory/sweep",
+                                     json={"tension": [1.0, -2.0]})
+        assert response.status_code == 400
+
+        response = await client.post("/api/v1/string-theory/sweep",
+                                     json={"alpha_prime": {"start": 1, "stop": 2}})
+        assert response.status_code == 400
+
+        # Oversized ranges are rejected from their size, before being expanded
+        for axis in ({"start": 1, "stop": 2, "num": 10**12},
+                     {"start": 1, "stop": 1e300, "step": 1e-300}):
+            response = await client.post("/api/v1/string-theory/sweep",
+                                         json={"tension": axis})
+            assert response.status_code == 400
+            response = await client.post("/api/v1/string-theory/jobs",
+                                         json={"kind": "sweep", "sweep": {"tension": axis}})
+            assert response.status_code == 400
+        response = await client.post("/api/v1/string-theory/thermodynamics",
+                                     json={"temperature": {"start": 0.1, "stop": 0.9,
+                                                           "num": 10**12}})
+        assert response.status_code == 400
+
+# Spectrum size and streaming tests
+async def test_max_level_option():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/v1/string-theory/", params={"max_level": 99})
+        assert response.status_code == 200
+        assert len(response.json()["data"]["mass_spectrum"]) == 100
+
+        response = await client.get("/api/v1/string-theory/", params={"max_level": -1})
+        assert response.status_code == 422
+
+async def test_stream_mass_spectrum():
+    """Test that both stream formats reproduce the inline spectrum."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        max_level = 200_000
+        inline = await client.get("/api/v1/string-theory/", params={"max_level": 1000})
+        expected = inline.json()["data"]["mass_spectrum"]
+
+        response = await client.get("/api/v1/string-theory/spectrum/stream",
+                                    params={"max_level": max_level, "format": "binary"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        masses = np.frombuffer(response.content, dtype="<f8")
+        assert masses.size == max_level + 1
+        np.testing.assert_allclose(masses[:1001], expected)
+
+        response = await client.get("/api/v1/string-theory/spectrum/stream",
+                                    params={"max_level": max_level})
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["offset"] == 0
+        assert sum(len(line["mass_spectrum"]) for line in lines) == max_level + 1
+        np.testing.assert_allclose(lines[0]["mass_spectrum"][:1001], expected)
+
+async def test_state_cache_hits():
+    """Test that repeated polls are served from the cache and updates invalidate it."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.get("/api/v1/string-theory/")
+        before = (await client.get("/api/v1/string-theory/cache/stats")).json()["data"]
+
+        for _ in range(3):
+            await client.get("/api/v1/string-theory/")
+        after = (await client.get("/api/v1/string-theory/cache/stats")).json()["data"]
+        assert after["hits"] - before["hits"] == 6  # state + spectrum per poll
+        assert after["misses"] == before["misses"]
+
+        old_spectrum = (await client.get("/api/v1/string-theory/")).json()["data"]["mass_spectrum"]
+        response = await client.post("/api/v1/string-theory/update",
+                                     json={"tension": 3.25})
+        updated = response.json()["data"]
+        state = (await client.get("/api/v1/string-theory/")).json()["data"]
+        assert state["tension"] == 3.25
+        assert state["mass_spectrum"] == updated["mass_spectrum"]
+        assert state["mass_spectrum"] != old_spectrum
+
+async def test_etag_not_modified():
+    """Test that polling with a current ETag returns 304 until the state changes."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/v1/string-theory/")
+        etag = response.headers["etag"]
+        version = response.json()["data"]["version"]
+
+        response = await client.get("/api/v1/string-theory/",
+                                    headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = await client.post("/api/v1/string-theory/update", json={"coupling": 0.3})
+        assert response.json()["data"]["version"] > version
+        new_etag = response.headers["etag"]
+        assert new_etag != etag
+
+        response = await client.get("/api/v1/string-theory/",
+                                    headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] == new_etag
+
+# Push stream tests
+async def test_update_pushes_latest_state_to_subscribers():
+    """Test that subscribers get the newest state and skip intermediate versions."""
+    from app.api.deps import state_backend
+
+    broadcaster = (await state_backend.get_session()).broadcaster
+    subscription = broadcaster.subscribe()
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            for tension in [1.25, 1.5, 1.75]:
+                response = await client.post("/api/v1/string-theory/update",
+                                             json={"tension": tension})
+            version = response.json()["data"]["version"]
+
+        message = await subscription.get(timeout=1.0)
+        assert subscription.dropped == 2
+        event = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+        assert event["event"] == "state"
+        assert event["id"] == str(version)
+        assert json.loads(event["data"])["tension"] == 1.75
+
+        # Nothing new has been published since
+        assert await subscription.get(timeout=0.01) is None
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+# Session tests
+async def test_sessions_are_independent():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/string-theory/sessions")
+        session_id = response.json()["data"]["session_id"]
+        headers = {"X-Session-ID": session_id}
+
+        default_state = (await client.get("/api/v1/string-theory/")).json()["data"]
+        response = await client.post("/api/v1/string-theory/update",
+                                     json={"dimensions": 26, "tension": 7.0},
+                                     headers=headers)
+        assert response.status_code == 200
+
+        session_state = (await client.get("/api/v1/string-theory/", headers=headers)).json()["data"]
+        assert session_state["dimensions"] == 26
+        assert session_state["tension"] == 7.0
+        after = (await client.get("/api/v1/string-theory/")).json()["data"]
+        assert after["dimensions"] == default_state["dimensions"]
+        assert after["tension"] == default_state["tension"]
+
+        stats = (await client.get("/api/v1/string-theory/sessions/stats")).json()["data"]
+        assert stats["sessions"] >= 2
+        assert stats["bytes_per_session"] > 0
+
+        response = await client.delete(f"/api/v1/string-theory/sessions/{session_id}")
+        assert response.status_code == 200
+        response = await client.delete(f"/api/v1/string-theory/sessions/{session_id}")
+        assert response.status_code == 404
+
+        response = await client.get("/api/v1/string-theory/",
+                                    headers={"X-Session-ID": "not a valid id!"})
+        assert response.status_code == 400
+
+async def test_concurrent_session_updates_are_atomic():
+    """Test that concurrent updates apply whole, merged into batches."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        headers = {"X-Session-ID": "atomic-test"}
+        initial = (await client.get("/api/v1/string-theory/", headers=headers)).json()["data"]
+
+        updates = [{"tension": float(i), "coupling": i / 100} for i in range(1, 21)]
+        responses = await asyncio.gather(*[
+            client.post("/api/v1/string-theory/update", json=params, headers=headers)
+            for params in updates
+        ])
+        states = [r.json()["data"] for r in responses]
+        assert all(state["coupling"] == state["tension"] / 100 for state in states)
+        versions = sorted({state["version"] for state in states})
+        # Bursts are merged, so there are at most as many versions as writes
+        assert versions == list(range(initial["version"] + 1, versions[-1] + 1))
+        assert len(versions) <= len(updates)
+
+        final = (await client.get("/api/v1/string-theory/", headers=headers)).json()["data"]
+        assert final["version"] == versions[-1]
+        assert final["coupling"] == final["tension"] / 100
+
+async def test_session_eviction():
+    from app.models.sessions import SessionStore
+
+    store = SessionStore(max_sessions=3, idle_timeout=3600)
+    for i in range(5):
+        store.get(f"s{i}")
+    assert len(store) == 4  # three sessions plus the pinned default
+    assert store.evictions == 2
+    assert store.delete("s0") is False
+    assert store.delete("s4") is True
+
+    store.idle_timeout = 0
+    store.get("fresh")
+    assert len(store) == 2
+
+# Field selection tests
+async def test_field_selection():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/v1/string-theory/",
+                                    params={"exclude": "compactification.metric,mass_spectrum"})
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert "mass_spectrum" not in data
+        assert "metric" not in data["compactification"]
+        assert "topology" in data["compactification"]
+        excluded_etag = response.headers["etag"]
+
+        response = await client.get("/api/v1/string-theory/",
+                                    params={"fields": "dimensions,compactification.topology"})
+        data = response.json()["data"]
+        assert data == {"dimensions": data["dimensions"],
+                        "compactification": {"topology": data["compactification"]["topology"]}}
+        assert response.headers["etag"] != excluded_etag
+
+        response = await client.post("/api/v1/string-theory/update",
+                                     params={"fields": "tension,version"},
+                                     json={"tension": 1.0})
+        assert set(response.json()["data"]) == {"tension", "version"}
+
+async def test_metric_payload_is_linear_in_dimensions():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/string-theory/update", json={"dimensions": 26})
+        metric = response.json()["data"]["compactification"]["metric"]
+        assert metric == {"kind": "diagonal", "size": 22, "diagonal": [1.0] * 22}
+        await client.post("/api/v1/string-theory/update", json={"dimensions": 10})
+
+async def test_custom_metric_per_topology():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        metric = [[2.0, 0.5], [0.5, 1.0]]
+        response = await client.post("/api/v1/string-theory/update",
+                                     json={"dimensions": 6, "metric": metric})
+        assert response.status_code == 200
+        compactification = response.json()["data"]["compactification"]
+        assert compactification["metric"] == {"kind": "dense", "size": 2, "values": metric}
+
+        # Each topology keeps its own metric
+        response = await client.post("/api/v1/string-theory/update", json={"topology": "K3"})
+        assert response.json()["data"]["compactification"]["metric"]["kind"] == "diagonal"
+        response = await client.post("/api/v1/string-theory/update",
+                                     json={"topology": "Calabi-Yau"})
+        assert response.json()["data"]["compactification"]["metric"]["values"] == metric
+
+        for invalid in ([[1.0, 2.0], [2.0, 1.0]],   # Not positive definite
+                        [[1.0, 0.1], [0.0, 1.0]],   # Not symmetric
+                        [1.0, 1.0, 1.0],            # Wrong size
+                        [1.0, -1.0]):
+            response = await client.post("/api/v1/string-theory/update",
+                                         json={"metric": invalid})
+            assert response.status_code == 400
+        response = await client.get("/api/v1/string-theory/")
+        assert response.json()["data"]["compactification"]["metric"]["values"] == metric
+
+        await client.post("/api/v1/string-theory/update", json={"dimensions": 10})
+
+async def test_metrics_endpoint():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.get("/api/v1/string-theory/")
+        response = await client.post("/api/v1/string-theory/update", json={"metric": [0.0]})
+        assert response.status_code == 400
+
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert ('http_requests_total{method="GET",route="/api/v1/string-theory/",'
+                'status="200"}') in body
+        assert ('http_errors_total{method="POST",route="/api/v1/string-theory/update",'
+                'status="400"}') in body
+        for operation in ("mass_spectrum", "update_parameters", "serialize_state"):
+            assert f'cats_cradle_operation_seconds_count{{operation="{operation}"}}' in body
+
+async def test_request_profiling():
+    from collections import deque
+    from app.core.profiling import ProfilingMiddleware
+
+    profiles = deque(maxlen=5)
+    profiled_app = ProfilingMiddleware(app, profiles, allow_header=True)
+    async with AsyncClient(app=profiled_app, base_url="http://test") as client:
+        response = await client.get("/api/v1/string-theory/")
+        assert "x-profile-id" not in response.headers
+        assert not profiles
+
+        response = await client.get("/api/v1/string-theory/", headers={"X-Profile": "1"})
+        assert response.status_code == 200
+        assert profiles[0]["id"] == response.headers["x-profile-id"]
+        assert profiles[0]["path"] == "/api/v1/string-theory/"
+        assert "function calls" in profiles[0]["summary"]
+
+        # Disabled in the default settings
+        response = await client.get("/metrics/profiles")
+        assert response.status_code == 404
+
+async def test_binary_and_msgpack_responses():
+    msgpack = pytest.importorskip("msgpack")
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/api/v1/string-theory/", params={"max_level": 99})
+        spectrum = response.json()["data"]["mass_spectrum"]
+        json_etag = response.headers["etag"]
+
+        response = await client.get("/api/v1/string-theory/", params={"max_level": 99},
+                                    headers={"Accept": "application/octet-stream"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        assert response.headers["x-levels"] == "100"
+        assert len(response.content) == 8 * 100
+        np.testing.assert_array_equal(np.frombuffer(response.content, dtype='<f8'), spectrum)
+        # Different representations of one version must not share an ETag
+        assert response.headers["etag"] != json_etag
+        assert "Accept" in response.headers["vary"]
+
+        response = await client.get("/api/v1/string-theory/",
+                                    headers={"Accept": "application/msgpack"})
+        data = msgpack.unpackb(response.content)["data"]
+        assert data["dimensions"] == 10
+        np.testing.assert_array_equal(np.frombuffer(data["mass_spectrum"], dtype='<f8'),
+                                      spectrum[:10])
+
+        # Exact degeneracies outgrow 64 bits: they arrive as decimal strings
+        exact = (await client.get("/api/v1/string-theory/", params={
+            "max_level": 100})).json()["data"]["degeneracy"]
+        assert exact[100] >= 2 ** 64
+        response = await client.get("/api/v1/string-theory/", params={"max_level": 100},
+                                    headers={"Accept": "application/msgpack"})
+        assert response.status_code == 200
+        degeneracy = msgpack.unpackb(response.content)["data"]["degeneracy"]
+        assert [int(count) for count in degeneracy] == exact
+        assert degeneracy[1] == exact[1] and degeneracy[100] == str(exact[100])
+        response = await client.post("/api/v1/string-theory/update", params={"max_level": 100},
+                                     headers={"Accept": "application/msgpack"},
+                                     json={"tension": 1.0})
+        assert response.status_code == 200
+
+        # Preference follows q-values; unknown types fall back to JSON
+        response = await client.get("/api/v1/string-theory/", headers={
+            "Accept": "application/octet-stream;q=0.5, application/json"})
+        assert response.headers["content-type"] == "application/json"
+        response = await client.get("/api/v1/string-theory/", headers={"Accept": "text/html"})
+        assert response.json()["status"] == "success"
+
+        response = await client.post("/api/v1/string-theory/sweep",
+                                     headers={"Accept": "application/octet-stream"},
+                                     json={"tension": [1.0, 2.0, 3.0]})
+        assert response.headers["x-shape"] == "3,10"
+        sweep = np.frombuffer(response.content, dtype='<f8').reshape(3, 10)
+        np.testing.assert_allclose(sweep[0], spectrum[:10])
+
+async def test_spectrum_and_sweep_jobs():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/string-theory/jobs",
+                                     json={"kind": "spectrum", "max_level": 50_000})
+        assert response.status_code == 202
+        job = response.json()["data"]
+        assert job["status"] in ("queued", "running", "completed")
+
+        response = await client.get(f"/api/v1/string-theory/jobs/{job['job_id']}",
+                                    params={"wait": 10})
+        job = response.json()["data"]
+        assert job["status"] == "completed"
+        assert job["run_ms"] >= 0 and job["queued_ms"] >= 0
+
+        response = await client.get(f"/api/v1/string-theory/jobs/{job['job_id']}/result",
+                                    headers={"Accept": "application/octet-stream"})
+        masses = np.frombuffer(response.content, dtype='<f8')
+        assert masses.size == 50_001
+        # Large inline requests are computed on the pool too, with the same result
+        response = await client.get("/api/v1/string-theory/",
+                                    params={"max_level": 50_000, "fields": "mass_spectrum"})
+        np.testing.assert_array_equal(response.json()["data"]["mass_spectrum"], masses)
+
+        response = await client.post("/api/v1/string-theory/jobs", json={
+            "kind": "sweep", "sweep": {"tension": [1.0, 4.0]}})
+        job_id = response.json()["data"]["job_id"]
+        await client.get(f"/api/v1/string-theory/jobs/{job_id}", params={"wait": 10})
+        result = (await client.get(f"/api/v1/string-theory/jobs/{job_id}/result")).json()
+        assert result["data"]["n_points"] == 2
+        assert result["data"]["tension"] == [1.0, 4.0]
+
+        response = await client.post("/api/v1/string-theory/jobs", json={
+            "kind": "sweep", "sweep": {"dimensions": [30]}})
+        job_id = response.json()["data"]["job_id"]
+        await client.get(f"/api/v1/string-theory/jobs/{job_id}", params={"wait": 10})
+        response = await client.get(f"/api/v1/string-theory/jobs/{job_id}/result")
+        assert response.status_code == 400
+
+        response = await client.get("/api/v1/string-theory/jobs/unknown")
+        assert response.status_code == 404
+        response = await client.delete(f"/api/v1/string-theory/jobs/{job_id}")
+        assert response.status_code == 409
+
+async def test_job_queue_bound_and_cancellation():
+    import threading
+    from app.core.compute import ComputePool, JobManager, JobQueueFullError
+
+    pool = ComputePool(workers=1)
+    manager = JobManager(pool, max_queue=2)
+    release = threading.Event()
+    try:
+        blocking = manager.submit("test", {}, release.wait, 10)
+        queued = manager.submit("test", {}, sum, [1, 2])
+        with pytest.raises(JobQueueFullError):
+            manager.submit("test", {}, sum, [3])
+
+        assert manager.cancel(queued)
+        await manager.wait(queued, 1)
+        assert queued.status == "cancelled"
+        assert queued._future.cancelled()  # Never reached a worker
+
+        release.set()
+        await manager.wait(blocking, 5)
+        assert blocking.status == "completed"
+        assert manager.stats()["active"] == 0
+        assert manager.submit("test", {}, sum, [3]) is not None
+    finally:
+        release.set()
+        pool.shutdown()
+
+async def test_updates_only_touch_what_changes():
+    from app.api.deps import state_backend
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        headers = {"X-Session-ID": "incremental-test"}
+        response = await client.post("/api/v1/string-theory/update", headers=headers,
+                                     json={"topology": "K3", "compactification_radius": 2.0})
+        state = response.json()["data"]
+        etag = response.headers["etag"]
+
+        # Re-sending current values is a no-op: same version, ETag and system
+        system = (await state_backend.get_session("incremental-test")).system
+        response = await client.post("/api/v1/string-theory/update", headers=headers,
+                                     json={"dimensions": 10, "tension": state["tension"]})
+        assert response.json()["data"]["version"] == state["version"]
+        assert response.headers["etag"] == etag
+        assert (await state_backend.get_session("incremental-test")).system is system
+        assert response.json()["data"]["compactification"]["topology"] == "K3"
+        assert response.json()["data"]["compactification"]["radius"] == [2.0] * 6
+
+        # A new dimension count resizes the radii but keeps the topology
+        response = await client.post("/api/v1/string-theory/update", headers=headers,
+                                     json={"dimensions": 12})
+        compactification = response.json()["data"]["compactification"]
+        assert compactification["topology"] == "K3"
+        assert compactification["radius"] == [1.0] * 8
+
+        # Rejected updates change nothing, not even the version
+        version = response.json()["data"]["version"]
+        response = await client.post("/api/v1/string-theory/update", headers=headers,
+                                     json={"tension": 2.0, "metric": [1.0]})
+        assert response.status_code == 400
+        state = (await client.get("/api/v1/string-theory/", headers=headers)).json()["data"]
+        assert state["version"] == version
+        assert state["tension"] != 2.0
+
+async def test_history_range_downsampling_and_restore():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        headers = {"X-Session-ID": "history-test"}
+        await client.post("/api/v1/string-theory/update", headers=headers,
+                          json={"topology": "Torus", "metric": [2.0, 1.0, 1.0, 1.0, 1.0, 1.0]})
+        snapshot = (await client.get("/api/v1/string-theory/", headers=headers)).json()["data"]
+        for tension in np.linspace(1.5, 3.0, 20):
+            await client.post("/api/v1/string-theory/update", headers=headers,
+                              json={"tension": float(tension), "dimensions": 12})
+
+        response = await client.get("/api/v1/string-theory/history", headers=headers)
+        history = response.json()["data"]
+        assert history["n_points"] == 22  # Initial state plus one row per applied update
+        assert history["version"] == list(range(22))
+        assert history["tension"][-1] == 3.0
+        assert len(history["mass_spectrum"][0]) == history["n_states"]
+
+        response = await client.get("/api/v1/string-theory/history", headers=headers,
+                                    params={"max_points": 5})
+        versions = response.json()["data"]["version"]
+        assert len(versions) == 5 and versions[0] == 0 and versions[-1] == 21
+
+        timestamps = history["timestamp"]
+        response = await client.get("/api/v1/string-theory/history", headers=headers,
+                                    params={"start": timestamps[5], "end": timestamps[10]})
+        assert response.json()["data"]["version"] == list(range(5, 11))
+
+        response = await client.get(f"/api/v1/string-theory/history/{snapshot['version']}",
+                                    headers=headers)
+        past = response.json()["data"]
+        assert past["compactification"] == snapshot["compactification"]
+        assert past["mass_spectrum"] == snapshot["mass_spectrum"]
+
+        response = await client.post(
+            f"/api/v1/string-theory/history/{snapshot['version']}/restore", headers=headers)
+        restored = response.json()["data"]
+        assert restored["version"] == 22
+        assert restored["compactification"] == snapshot["compactification"]
+        assert restored["tension"] == snapshot["tension"]
+
+        response = await client.get("/api/v1/string-theory/history/999", headers=headers)
+        assert response.status_code == 404
+
+async def test_history_ring_buffer_is_compact():
+    from app.models.history import StateHistory
+    from app.models.string_theory import StringTheorySystem
+
+    history = StateHistory(capacity=50)
+    system = StringTheorySystem()
+    for i in range(120):
+        system = system.copy()
+        system.update_parameters({"coupling": 0.01 * (i + 1)})
+        history.record(system, timestamp=float(i))
+
+    assert len(history) == 50
+    assert history.query()["version"].tolist() == list(range(71, 121))
+    assert history.query(start=100.0, end=104.0)["version"].tolist() == [101, 102, 103, 104, 105]
+    assert history.parameters(10) is None
+    assert history.parameters(120)["coupling"] == pytest.approx(1.2)
+    assert history.nbytes() / history.capacity < 400
+
+async def test_downsampled_spectrum():
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        headers = {"X-Session-ID": "downsample-test"}
+        await client.post("/api/v1/string-theory/update", headers=headers,
+                          json={"dimensions": 10, "tension": 1.0, "alpha_prime": 1.0,
+                                "topology": "Calabi-Yau"})
+        for method in ("lttb", "minmax"):
+            response = await client.get("/api/v1/string-theory/", headers=headers, params={
+                "max_level": 1_000_000, "max_points": 800, "downsample": method,
+                "log_degeneracy": True})
+            assert response.status_code == 200
+            data = response.json()["data"]
+            levels = np.array(data["levels"])
+            assert len(levels) <= 800
+            assert levels[0] == 0 and levels[-1] == 1_000_000
+            assert np.all(np.diff(levels) > 0)
+            np.testing.assert_allclose(data["mass_spectrum"], np.sqrt(levels))
+            assert len(data["degeneracy"]) == len(levels)
+
+        # Exact counts stop at MAX_EXACT_LEVEL; later levels keep their place as null
+        from app.models.degeneracy import MAX_EXACT_LEVEL
+        data = (await client.get("/api/v1/string-theory/", headers=headers, params={
+            "max_level": 200_000, "max_points": 100})).json()["data"]
+        assert len(data["degeneracy"]) == len(data["levels"])
+        for level, count in zip(data["levels"], data["degeneracy"]):
+            assert (count is None) == (level > MAX_EXACT_LEVEL)
+
+        # Small spectra are returned whole
+        response = await client.get("/api/v1/string-theory/", headers=headers,
+                                    params={"max_points": 100})
+        assert response.json()["data"]["levels"] == list(range(10))
+
+        response = await client.get("/api/v1/string-theory/", headers=headers,
+                                    params={"max_level": 1_000_000})
+        assert response.status_code == 400
+
+        response = await client.get("/api/v1/string-theory/", params={
+            "max_level": 50_000, "max_points": 100},
+            headers={**headers, "Accept": "application/octet-stream"})
+        assert response.headers["x-shape"] == "2,100"
+        levels, masses = np.frombuffer(response.content, dtype="<f8").reshape(2, 100)
+        np.testing.assert_allclose(masses, np.sqrt(levels))
+
+async def test_lttb_keeps_spikes():
+    from app.models.downsample import downsample
+
+    y = np.zeros(100_000)
+    y[[12_345, 67_890]] = [5.0, -3.0]
+    for method in ("lttb", "minmax"):
+        indices = downsample(y, 50, method)
+        assert len(indices) <= 50
+        assert {12_345, 67_890} <= set(indices.tolist())
+
+async def test_single_flight_and_write_batching():
+    from app.core.coalesce import COALESCED, SingleFlight, UpdateBatcher
+
+    flights = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return object()
+
+    results = await asyncio.gather(*[flights.do("key", compute) for _ in range(10)])
+    assert len(calls) == 1 and all(result is results[0] for result in results)
+    assert len(flights) == 0  # Not a cache: the next call computes again
+    await flights.do("key", compute)
+    assert len(calls) == 2
+
+    applied = []
+
+    async def apply(batch):
+        if any(params.get("tension", 1) <= 0 for params in batch):
+            raise ValueError("Tension must be positive")
+        applied.append(list(batch))
+        await asyncio.sleep(0.01)
+        return len(applied)
+
+    batcher = UpdateBatcher()
+    coalesced = COALESCED.value("write")
+    writes = [{"tension": 1.0}, {"coupling": 0.2}, {"tension": 3.0}]
+    results = await asyncio.gather(*[batcher.submit("session", w, apply) for w in writes])
+    assert applied == [writes]  # One application, in arrival order
+    assert results == [1, 1, 1]
+    assert COALESCED.value("write") == coalesced + 2
+
+    # A rejected write fails alone; the others still apply, in order, and
+    # none of them counts as coalesced
+    applied.clear()
+    writes = [{"tension": 2.0}, {"tension": -1.0}, {"coupling": 0.3}]
+    results = await asyncio.gather(*[batcher.submit("session", w, apply) for w in writes],
+                                   return_exceptions=True)
+    assert isinstance(results[1], ValueError)
+    assert applied == [[{"tension": 2.0}], [{"coupling": 0.3}]]
+    assert COALESCED.value("write") == coalesced + 2
+
+async def test_batched_writes_match_sequential_updates():
+    """Coupled parameters in one batch end up as if each write was applied in turn"""
+    from app.api.deps import update_batcher
+    from app.models.string_theory import StringTheorySystem
+
+    metric = [2.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+    cases = [
+        # A restore sets radius, a slider write right after it sets compactification_radius
+        ({"dimensions": 10, "compactification_radius": 2.0},
+         [{"radius": [1.0] * 6}, {"compactification_radius": 3.0}]),
+        # K3's metric must not move to the Torus
+        ({"dimensions": 10, "topology": "Calabi-Yau"},
+         [{"topology": "K3", "metric": metric}, {"topology": "Torus"}]),
+    ]
+    window = update_batcher.window
+    update_batcher.window = 0.05  # Long enough for both writes to join one batch
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            for initial, writes in cases:
+                session_id = (await client.post("/api/v1/string-theory/sessions")).json()[
+                    "data"]["session_id"]
+                headers = {"X-Session-ID": session_id}
+                response = await client.post("/api/v1/string-theory/update", json=initial,
+                                             headers=headers)
+                start = response.json()["data"]["version"]
+                if "radius" in writes[0]:  # Only a restore sends radius
+                    first = client.post(
+                        f"/api/v1/string-theory/history/{start - 1}/restore", headers=headers)
+                else:
+                    first = client.post("/api/v1/string-theory/update", json=writes[0],
+                                        headers=headers)
+                first = asyncio.ensure_future(first)
+                await asyncio.sleep(0.01)
+                second = await client.post("/api/v1/string-theory/update", json=writes[1],
+                                           headers=headers)
+                first = await first
+                assert first.status_code == second.status_code == 200
+                state = second.json()["data"]
+                assert first.json()["data"]["version"] == state["version"] == start + 1
+
+                expected = StringTheorySystem()
+                expected.update_parameters(initial)
+                for params in writes:
+                    expected.update_parameters(params)
+                compactification = expected.to_dict()["compactification"]
+                assert state["compactification"]["topology"] == compactification["topology"]
+                assert state["compactification"]["radius"] == compactification["radius"]
+                assert state["compactification"]["metric"] == compactification["metric"]
+    finally:
+        update_batcher.window = window
@@ -0,0 +1,33 @@
+from benchmarks.run import compare, run
+
+def test_benchmark_report_and_baseline_comparison():
+    report = run(dimensions=[10], levels=[10], min_time=0.001, repeat=2,
+                 only="mass_spectrum[", include_api=False)
+    assert [result['case'] for result in report['results']] == [
+        "mass_spectrum[dimensions=10,levels=10]"]
+    assert report['results'][0]['median_us'] > 0
+
+    baseline = {'results': [dict(result, median_us=result['median_us'] / 2)
+                            for result in report['results']]}
+    assert compare(report, baseline, threshold=0.5)[0]['ratio'] > 1.5
+    assert compare(report, report, threshold=0.5) == []
+    assert compare(report, {'results': []}, threshold=0.5) == []
+
+def test_load_report_and_baseline_comparison():
+    import asyncio
+    from benchmarks import load
+
+    report = asyncio.run(load.simulate(clients=8, duration=0.5, interval=0.1,
+                                       update_fraction=0.25, sessions=2))
+    polls, updates = report['endpoints']['GET /'], report['endpoints']['POST /update']
+    assert report['meta']['updating_clients'] == 2
+    assert polls['requests'] > 8 and updates['requests'] >= 2
+    assert report['totals']['error_rate'] == 0
+    assert polls['latency_ms']['p50'] <= polls['latency_ms']['p99']
+    assert polls['bytes'] > 0
+
+    slower = {'endpoints': {name: dict(endpoint, latency_ms={
+        key: value / 2 for key, value in endpoint['latency_ms'].items()})
+        for name, endpoint in report['endpoints'].items()}}
+    assert {r['metric'] for r in load.compare(report, slower, threshold=0.5)} >= {"GET / p50"}
+    assert load.compare(report, report, threshold=0.5) == []
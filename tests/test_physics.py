@@ -128,4 +128,270 @@ async def test_mass_gap():
         
         # Check for non-zero mass gap
         mass_differences = np.diff(spectrum)
-        assert all(diff > 0 for diff in mass_differences)
\ No newline at end of file
+        assert all(diff > 0 for diff in mass_differences)
+async def test_sweep_matches_single_point_spectrum():
+    """Test that every sweep row equals the spectrum of the same single system."""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        request = {
+            "dimensions": [10, 26],
+            "tension": [1.0, 4.0],
+            "alpha_prime": [0.5],
+            "topology": ["Torus", "K3"]
+        }
+        response = await client.post("/api/v1/string-theory/sweep", json=request)
+        result = response.json()["data"]
+
+        for i in range(result["n_points"]):
+            params = {
+                "dimensions": result["dimensions"][i],
+                "tension": result["tension"][i],
+                "alpha_prime": result["alpha_prime"][i],
+                "topology": result["topology"][i]
+            }
+            response = await client.post("/api/v1/string-theory/update", json=params)
+            expected = response.json()["data"]["mass_spectrum"]
+            np.testing.assert_allclose(result["mass_spectrum"][i], expected, rtol=1e-12)
+
+        # Restore defaults for the remaining tests
+        await client.post("/api/v1/string-theory/update",
+                          json={"dimensions": 10, "tension": 1.0, "alpha_prime": 1.0,
+                                "compactification_radius": 1.0, "topology": "Calabi-Yau"})
+
+async def test_level_degeneracy():
+    """Test state counts against the light-cone partition functions.
+    Superstring in D=10: 16 * prod((1+q^n)/(1-q^n))^8; bosonic in D=26: prod(1-q^n)^-24"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/string-theory/update", json={"dimensions": 10})
+        degeneracy = response.json()["data"]["degeneracy"]
+        assert degeneracy[:5] == [16, 256, 2304, 15360, 84224]
+        assert len(degeneracy) == len(response.json()["data"]["mass_spectrum"])
+
+        await client.post("/api/v1/string-theory/update", json={"dimensions": 26})
+        response = await client.get("/api/v1/string-theory/",
+                                    params={"theory": "bosonic", "max_level": 100})
+        degeneracy = response.json()["data"]["degeneracy"]
+        assert degeneracy[:6] == [1, 24, 324, 3200, 25650, 176256]
+        assert degeneracy[100] == 24347755825375550747564131778603771506206  # p_24(100)
+
+        response = await client.get("/api/v1/string-theory/", params={
+            "theory": "bosonic", "max_level": 20_000, "log_degeneracy": True})
+        log_degeneracy = np.array(response.json()["data"]["degeneracy"])
+        assert len(log_degeneracy) == 20_001
+        np.testing.assert_allclose(log_degeneracy[100], np.log(float(degeneracy[100])))
+        # Hagedorn growth: log d(n) ~ 4 pi sqrt(n) for the D=26 bosonic string
+        slope = np.diff(log_degeneracy[[10_000, 20_000]]) / np.diff(np.sqrt([10_000, 20_000]))
+        np.testing.assert_allclose(slope, 4 * np.pi, rtol=0.05)
+
+        await client.post("/api/v1/string-theory/update", json={"dimensions": 10})
+
+    from app.models.degeneracy import DegeneracySeries, get_series
+
+    # The blocked float64 sums are exact: compare with the big-integer recurrence,
+    # extending across block boundaries and from an already computed prefix
+    series = get_series("superstring", 24)
+    fresh = DegeneracySeries(series.transverse, series.odd_exponent, series.even_exponent,
+                             series.prefactor, series.growth)
+    fresh.coefficients(300)
+    counts = fresh.coefficients(1200)
+    weights, expected = series._weights(1200), [1]
+    for n in range(1, 1201):
+        expected.append(int(np.dot(weights[1:n + 1], expected[::-1])) // n)
+    assert counts == [series.prefactor * count for count in expected]
+
+async def test_kaluza_klein_tower():
+    """Test the momentum/winding tower on a single compact circle.
+    M^2 = (k/R)^2 + (wR/alpha')^2 + (2/alpha')(N_L + N_R) with N_L - N_R = k w"""
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.post("/api/v1/string-theory/update",
+                          json={"dimensions": 5, "compactification_radius": 2.0,
+                                "topology": "Calabi-Yau", "tension": 1.0})
+        response = await client.get("/api/v1/string-theory/spectrum/tower",
+                                    params={"cutoff": 2.0})
+        assert response.status_code == 200
+        tower = response.json()["data"]
+
+        # Mass scale of the default system: sqrt(T) * sqrt(D/10), alpha' = 1
+        scale = np.sqrt(5 / 10)
+        mass_sq = (np.array(tower["mass"]) / scale) ** 2
+        # k/R gives 0.25 steps, wR gives 4 steps, oscillators 4 steps
+        np.testing.assert_allclose(mass_sq[:5], [0.0, 0.25, 1.0, 2.25, 4.0])
+        # (k, w) = (±1, 0) twice, then the level-4 sums of KK, winding and oscillators
+        assert tower["multiplicity"][:2] == [1, 2]
+        assert tower["multiplicity"][4] == 2 + 2 + 1
+        assert all(np.diff(tower["mass"]) > 0)
+
+        response = await client.get("/api/v1/string-theory/spectrum/tower",
+                                    params={"cutoff": 2.0, "limit": 3})
+        assert response.json()["data"]["n_levels"] == 3
+
+        response = await client.post("/api/v1/string-theory/update", json={"dimensions": 26})
+        response = await client.get("/api/v1/string-theory/spectrum/tower",
+                                    params={"cutoff": 3.0})
+        assert response.status_code == 200
+        assert response.json()["data"]["multiplicity"][1] == 2 * 22 * 2
+
+        # The total work is bounded, not only the bins kept per circle
+        response = await client.get("/api/v1/string-theory/spectrum/tower",
+                                    params={"cutoff": 50.0})
+        assert response.status_code == 400
+
+        await client.post("/api/v1/string-theory/update", json={"dimensions": 10})
+
+async def test_tower_with_general_metric():
+    """Test the tower for a non-diagonal metric against direct lattice summation"""
+    from itertools import product
+    from collections import Counter
+    from app.models.metric import CompactMetric
+    from app.models.tower import enumerate_tower
+
+    metric = np.array([[1.0, 0.4], [0.4, 1.5]])
+    radius = np.diag([1.2, 0.8])
+    alpha_prime, cutoff_sq = 0.9, 10.0
+    momentum_form = np.linalg.inv(radius @ metric @ radius)
+    winding_form = radius @ metric @ radius / alpha_prime ** 2
+
+    expected = Counter()
+    for k in product(range(-6, 7), repeat=2):
+        for w in product(range(-6, 7), repeat=2):
+            k, w = np.array(k), np.array(w)
+            energy = k @ momentum_form @ k + w @ winding_form @ w
+            for n_right in range(20):
+                n_left = n_right + int(k @ w)
+                mass_sq = energy + 2 / alpha_prime * (n_left + n_right)
+                if n_left >= 0 and mass_sq <= cutoff_sq:
+                    expected[round(mass_sq, 9)] += 1
+
+    mass_sq, counts = enumerate_tower([1.2, 0.8], alpha_prime, cutoff_sq,
+                                      CompactMetric.from_matrix(metric))
+    levels = sorted(expected)
+    np.testing.assert_allclose(mass_sq, levels)
+    assert counts.tolist() == [expected[level] for level in levels]
+
+async def test_derived_quantities_track_their_inputs():
+    """Test that results are keyed only on the inputs they depend on"""
+    from app.models.string_theory import StringTheorySystem
+
+    system = StringTheorySystem()
+    spectrum_key = system._cache_key('spectrum')
+    state_key = system._cache_key('state')
+
+    # The oscillator spectrum does not depend on the coupling or the radii
+    assert system.update_parameters({"coupling": 0.2, "compactification_radius": 3.0})
+    assert system._cache_key('spectrum') == spectrum_key
+    assert system._cache_key('state') != state_key
+    assert not system.update_parameters({"coupling": 0.2, "dimensions": 10})
+
+    assert system.update_parameters({"tension": 2.0})
+    assert system._cache_key('spectrum') != spectrum_key
+
+async def test_thermodynamics_and_hagedorn_temperature():
+    """Test the canonical ensemble against a direct sum over levels"""
+    from app.models.string_theory import StringTheorySystem
+
+    system = StringTheorySystem(dimensions=10, tension=1.0, alpha_prime=1.0)
+    hagedorn = system.hagedorn_temperature()
+    # Superstring in D = 10: T_H = 1 / (2 pi sqrt(2 alpha')) in these units
+    assert hagedorn == pytest.approx(1 / (2 * np.pi * np.sqrt(2)))
+
+    temperatures = np.array([0.3, 0.9, 0.99]) * hagedorn
+    result = system.calculate_thermodynamics(temperatures, max_level=500)
+    levels = np.arange(2_000_001)
+    log_terms = system.calculate_degeneracy(len(levels) - 1, log=True) \
+        - np.sqrt(levels)[None, :] * system.mass_spectrum_array(1)[1] / temperatures[:, None]
+    peak = log_terms.max(axis=1)
+    direct = peak + np.log(np.exp(log_terms - peak[:, None]).sum(axis=1))
+    np.testing.assert_allclose(result['log_partition_function'], direct, rtol=1e-6)
+    np.testing.assert_allclose(result['free_energy'], -temperatures * direct, rtol=1e-6)
+    assert np.all(np.diff(result['energy']) > 0)
+    assert np.all(result['entropy'] >= 0)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/string-theory/thermodynamics", json={
+            "temperature": {"start": 0.01, "stop": 1.2, "num": 10_000}, "relative": True,
+            "density": True, "max_level": 100})
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert len(data["temperature"]) == 10_000
+        above = np.array(data["temperature"]) > data["hagedorn_temperature"]
+        assert all(value is None for value, hot in zip(data["free_energy"], above) if hot)
+        assert all(value is not None for value, hot in zip(data["free_energy"], above) if not hot)
+        assert len(data["density_of_states"]["log_density"]) == 100
+
+        response = await client.post("/api/v1/string-theory/thermodynamics",
+                                     json={"temperature": [0.1, -1.0]})
+        assert response.status_code == 400
+
+        # Low dimensions: log Z stays finite and continuous up to T_H, where the
+        # energy sum diverges for D <= 5
+        for theory in ("bosonic", "superstring"):
+            for dimensions in (4, 5):
+                system = StringTheorySystem(dimensions=dimensions)
+                result = system.calculate_thermodynamics(
+                    np.array([0.999, 0.999999, 1.0]) * system.hagedorn_temperature(theory),
+                    theory, max_level=500)
+                log_z = result['log_partition_function']
+                assert np.all(np.isfinite(log_z)) and np.all(np.diff(log_z) > 0)
+                assert log_z[2] - log_z[1] < 0.01
+                assert np.all(np.isfinite(result['energy'][:2]))
+                assert result['energy'][1] < 1e3
+                assert result['energy'][2] == np.inf
+
+        session_id = (await client.post("/api/v1/string-theory/sessions")).json()["data"]["session_id"]
+        headers = {"X-Session-ID": session_id}
+        response = await client.post("/api/v1/string-theory/update", json={"dimensions": 4},
+                                     headers=headers)
+        assert response.status_code == 200
+        response = await client.post("/api/v1/string-theory/thermodynamics", json={
+            "temperature": [0.999, 1.0], "relative": True, "theory": "bosonic"},
+            headers=headers)
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["log_partition_function"][1] == pytest.approx(
+            data["log_partition_function"][0], abs=0.05)
+        assert data["energy"][1] is None and data["entropy"][1] is None
+
+async def test_precomputed_spectrum_table(tmp_path):
+    """Test that table lookups match live computation, and misses fall back to it"""
+    from app.models.spectrum_table import SpectrumTable, build_table
+    from app.models.string_theory import StringTheorySystem, use_spectrum_table
+
+    def live(**params):
+        system = StringTheorySystem(**params)
+        return system.mass_spectrum_array(99).copy(), system.calculate_degeneracy(99, log=True)
+
+    expected = {(d, t, a): live(dimensions=d, tension=t, alpha_prime=a)
+                for d, t, a in [(10, 1.0, 2.0), (10, 1.5, 1.5), (11, 1.0, 1.0)]}
+
+    path = str(tmp_path / "spectra.table")
+    build_table(path, tensions=[1.0, 2.0], alpha_primes=[1.0, 2.0], levels=100,
+                dimensions=[10, 12])
+    table = SpectrumTable(path, interpolate=True)
+    use_spectrum_table(table)
+    try:
+        system = StringTheorySystem(dimensions=10, tension=1.0, alpha_prime=2.0)
+        masses = system.mass_spectrum_array(99)
+        np.testing.assert_array_equal(masses, expected[(10, 1.0, 2.0)][0])
+        assert not masses.flags.writeable
+        np.testing.assert_allclose(system.calculate_degeneracy(99, log=True),
+                                   expected[(10, 1.0, 2.0)][1])
+
+        # Between grid values: interpolated, exactly for the power-law mass formula
+        system = StringTheorySystem(dimensions=10, tension=1.5, alpha_prime=1.5)
+        np.testing.assert_allclose(system.mass_spectrum_array(99),
+                                   expected[(10, 1.5, 1.5)][0], rtol=1e-12)
+
+        # Dimensions outside the table are computed live
+        system = StringTheorySystem(dimensions=11, tension=1.0, alpha_prime=1.0)
+        np.testing.assert_array_equal(system.mass_spectrum_array(99),
+                                      expected[(11, 1.0, 1.0)][0])
+        assert table.stats()['hits'] == 1
+        assert table.stats()['interpolated'] == 1
+        assert table.stats()['misses'] == 1
+    finally:
+        use_spectrum_table(None)
+
+    with open(path, 'r+b') as f:
+        f.seek(8)
+        f.write(b"\x63\x00\x00\x00")  # Unknown format version
+    with pytest.raises(ValueError):
+        SpectrumTable(path)
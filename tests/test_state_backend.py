@@ -0,0 +1,173 @@
+import asyncio
+import numpy as np
+import pytest
+from app.models.sessions import SessionStore
+from app.models.state_backend import (
+    RedisStateBackend, StateConflictError, decode_system, encode_system, record_epoch
+)
+from app.models.string_theory import StringTheorySystem
+
+fakeredis = pytest.importorskip("fakeredis")
+
+pytestmark = pytest.mark.asyncio
+
+def make_workers(count=2, **kwargs):
+    """Backends sharing one in-process Redis, as separate workers would"""
+    server = fakeredis.FakeServer()
+    return [
+        RedisStateBackend(fakeredis.aioredis.FakeRedis(server=server), SessionStore(), **kwargs)
+        for _ in range(count)
+    ]
+
+async def test_record_round_trip():
+    system = StringTheorySystem()
+    system.update_parameters({"dimensions": 14, "tension": 2.5, "compactification_radius": 1.5})
+    system.update_parameters({"topology": "Orbifold"})
+
+    data = encode_system(system, "0123abcd")
+    assert len(data) == 35 + 8 + 8 * 10
+    assert record_epoch(data) == "0123abcd"
+    restored = decode_system(data)
+    assert restored.to_parameters() == system.to_parameters()
+    assert restored.calculate_mass_spectrum() == system.calculate_mass_spectrum()
+
+    system.set_metric([[2.0, 0.3] + [0.0] * 8, [0.3, 1.0] + [0.0] * 8,
+                       *np.eye(10)[2:].tolist()])
+    system.set_metric([2.0] * 10, topology="K3")
+    data = encode_system(system)
+    assert len(data) == 35 + 8 + 8 * 10 + 2 * 3 + 8 * (100 + 10)
+    assert record_epoch(data) is None
+    restored = decode_system(data)
+    assert restored.to_parameters() == system.to_parameters()
+    assert restored.compactification['metric'] == system.compactification['metric']
+
+    # Metrics kept for other topologies may have been set in other dimensions
+    system.update_parameters({"dimensions": 6, "topology": "Torus", "metric": [2.0, 3.0]})
+    system.update_parameters({"dimensions": 26})
+    restored = decode_system(encode_system(system))
+    assert restored.to_parameters() == system.to_parameters()
+
+async def test_update_visible_to_other_workers():
+    first, second = make_workers()
+    try:
+        # Both workers have the default session cached locally
+        assert (await first.get_session()).system.version == 0
+        assert (await second.get_session()).system.version == 0
+
+        session = await first.get_session()
+        await first.update(session, {"tension": 3.0})
+        assert (await first.history(session)).query()["version"].tolist() == [0, 1]
+
+        for _ in range(100):  # Wait for the invalidation to arrive
+            if "default" in second._stale:
+                break
+            await asyncio.sleep(0.01)
+        system = (await second.get_session()).system
+        assert system.tension == 3.0
+        assert system.version == 1
+    finally:
+        await first.close()
+        await second.close()
+
+async def test_concurrent_updates_across_workers():
+    workers = make_workers(3)
+    try:
+        sessions = [await worker.get_session("shared") for worker in workers]
+        results = await asyncio.gather(*[
+            worker.update(session, {"coupling": 0.01 * (3 * i + j + 1)})
+            for i in range(5)
+            for j, (worker, session) in enumerate(zip(workers, sessions))
+        ])
+        assert sorted(system.version for system in results) == list(range(1, 16))
+
+        with pytest.raises(ValueError):
+            await workers[0].update(sessions[0], {"topology": "Sphere"})
+        system = (await workers[0].get_session("shared")).system
+        assert system.version == 15
+    finally:
+        for worker in workers:
+            await worker.close()
+
+async def test_update_gives_up_after_repeated_conflicts():
+    worker, = make_workers(1)
+    worker.max_retries = 0
+    try:
+        session = await worker.get_session()
+        with pytest.raises(StateConflictError):
+            await worker.update(session, {"tension": 2.0})
+    finally:
+        await worker.close()
+
+async def test_workers_share_the_session_epoch():
+    workers = make_workers(3)
+    try:
+        session = await workers[0].get_session("shared")
+        assert (await workers[1].get_session("shared")).epoch == session.epoch
+        await workers[0].update(session, {"tension": 2.0})
+        # Also for a worker that first sees the session after it changed
+        assert (await workers[2].get_session("shared")).epoch == session.epoch
+    finally:
+        for worker in workers:
+            await worker.close()
+
+async def test_workers_share_the_history():
+    first, second = make_workers()
+    try:
+        ours = await first.get_session("shared")
+        theirs = await second.get_session("shared")
+        await first.update(ours, {"tension": 2.0})
+        await second.update(theirs, {"coupling": 0.3})
+        await first.update(ours, {"dimensions": 12})
+
+        # Either worker lists every version, whoever wrote it, and can restore it
+        for worker, session in ((first, ours), (second, theirs)):
+            history = await worker.history(session)
+            assert history.query()["version"].tolist() == [0, 1, 2, 3]
+            params = history.parameters(2)
+            assert (params["tension"], params["coupling"], params["dimensions"]) == (2.0, 0.3, 10)
+
+        # Bounded like the local history, and dropped with the session
+        first.store.history_size = 2
+        await first.update(ours, {"tension": 3.0})
+        assert (await second.history(theirs)).query()["version"].tolist() == [3, 4]
+        await first.delete_session("shared")
+        assert not await first.redis.exists(first._history_key("shared"))
+    finally:
+        await first.close()
+        await second.close()
+
+async def test_expired_record_does_not_lose_parameters():
+    first, second = make_workers(ttl=60)
+    try:
+        session = await first.get_session("polled")
+        await first.update(session, {"tension": 2.0, "dimensions": 12})
+        await first.redis.delete(first._key("polled"))  # Expired while only being polled
+
+        # Another worker re-creates it with defaults; the next update must not build on them
+        assert (await second.get_session("polled")).system.version == 0
+        system = await first.update(session, {"coupling": 0.2})
+        assert (system.version, system.tension, system.dimensions) == (2, 2.0, 12)
+
+        # Polls served from the local cache keep the shared record alive
+        first._refreshed.clear()
+        await first.redis.persist(first._key("polled"))
+        await first.get_session("polled")
+        assert await first.redis.ttl(first._key("polled")) == 60
+    finally:
+        await first.close()
+        await second.close()
+
+async def test_client_follows_the_event_loop():
+    server = fakeredis.FakeServer()
+    worker = RedisStateBackend(None, SessionStore(),
+                               connect=lambda: fakeredis.aioredis.FakeRedis(server=server))
+
+    async def update(tension):
+        session = await worker.get_session()
+        return (await worker.update(session, {"tension": tension})).version
+
+    # A module-level backend outlives the loop it first ran on, e.g. between tests
+    assert await update(2.0) == 1
+    assert await asyncio.to_thread(asyncio.run, update(3.0)) == 2
+    assert await update(4.0) == 3
+    await worker.close()